@@ -0,0 +1,154 @@
+import argparse
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List
+
+class Assembler:
+
+    predefined_symbols = {
+        "SP": 0, "LCL": 1, "ARG": 2, "THIS": 3, "THAT": 4,
+        "SCREEN": 16384, "KBD": 24576,
+        **{ f'R{i}': i for i in range(16) },
+    }
+
+    # a-bit + c1..c6
+    comp_codes = {
+        "0": "0101010", "1": "0111111", "-1": "0111010",
+        "D": "0001100", "A": "0110000", "!D": "0001101", "!A": "0110001", "-D": "0001111", "-A": "0110011",
+        "D+1": "0011111", "A+1": "0110111", "D-1": "0001110", "A-1": "0110010",
+        "D+A": "0000010", "D-A": "0010011", "A-D": "0000111", "D&A": "0000000", "D|A": "0010101",
+        "M": "1110000", "!M": "1110001", "-M": "1110011", "M+1": "1110111", "M-1": "1110010",
+        "D+M": "1000010", "D-M": "1010011", "M-D": "1000111", "D&M": "1000000", "D|M": "1010101",
+    }
+
+    jump_codes = { "": 0, "JGT": 1, "JEQ": 2, "JGE": 3, "JLT": 4, "JNE": 5, "JLE": 6, "JMP": 7 }
+
+    rom_size = 32768
+    first_variable_address = 16
+
+
+    def __init__(self, instructions: List[str]):
+        """instructions are Hack assembly lines without comments or blank lines, e.g. Translate.instructions."""
+        self.instructions = instructions
+        self.symbols: Dict[str, int] = dict(self.predefined_symbols)
+        # the same C-instruction appears thousands of times in translated code, so each one is only decoded once
+        self.c_instruction_cache: Dict[str, int] = {}
+
+
+    @classmethod
+    def from_file(cls, filename: str) -> "Assembler":
+        with open(filename, "r") as file:
+            lines = file.read().splitlines()
+
+        instructions = []
+        for line in lines:
+            stripped_line = line.partition("//")[0].replace(" ", "").replace("\t", "")
+            if stripped_line:
+                instructions.append(stripped_line)
+
+        return cls(instructions)
+
+
+    def resolve_labels(self) -> None:
+        address = 0
+        for instruction in self.instructions:
+            if instruction[0] == "(":
+                self.symbols[instruction[1:-1]] = address
+            else:
+                address += 1
+
+        if address > self.rom_size:
+            print(f"Error: program is {address} words long, but the Hack ROM only holds {self.rom_size}.")
+            sys.exit(1)
+
+
+    def encode_c_instruction(self, instruction: str) -> int:
+        dest, _, rest = instruction.rpartition("=")
+        comp, _, jump = rest.partition(";")
+
+        if comp not in self.comp_codes or jump not in self.jump_codes:
+            print(f"Error: '{instruction}' is not a valid instruction.")
+            sys.exit(1)
+
+        dest_bits = ("A" in dest) << 2 | ("D" in dest) << 1 | ("M" in dest)
+        return 0b111 << 13 | int(self.comp_codes[comp], 2) << 6 | dest_bits << 3 | self.jump_codes[jump]
+
+
+    def assemble(self) -> List[int]:
+        self.resolve_labels()
+
+        symbols = self.symbols
+        c_instruction_cache = self.c_instruction_cache
+        next_variable = self.first_variable_address
+        words = []
+
+        for instruction in self.instructions:
+            first = instruction[0]
+
+            if first == "(":
+                continue
+
+            if first == "@":
+                value = instruction[1:]
+                if value.isdigit():
+                    words.append(int(value))
+                    continue
+
+                address = symbols.get(value)
+                if address is None:
+                    # any symbol that is not a label is a variable, allocated from RAM[16] on
+                    address = symbols[value] = next_variable
+                    next_variable += 1
+                words.append(address)
+                continue
+
+            word = c_instruction_cache.get(instruction)
+            if word is None:
+                word = c_instruction_cache[instruction] = self.encode_c_instruction(instruction)
+            words.append(word)
+
+        return words
+
+
+    def write_hack(self, output_filename: str) -> int:
+        """Writes one 16-digit binary line per word, in one write. Returns the number of words."""
+        words = self.assemble()
+        with open(output_filename, "w") as file:
+            file.write("".join(f'{word:016b}\n' for word in words))
+
+        return len(words)
+
+
+    def write_binary(self, output_filename: str) -> int:
+        """Writes the words packed as big-endian 16-bit integers, in one write. Returns the number of words."""
+        words = array("H", self.assemble())
+        if sys.byteorder == "little":
+            words.byteswap()
+
+        with open(output_filename, "wb") as file:
+            words.tofile(file)
+
+        return len(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python Assembler.py [filename.asm] [--binary]")
+    parser.add_argument("path")
+    parser.add_argument("--binary", action="store_true", help="write packed 16-bit words to <Name>.bin instead of <Name>.hack")
+    args = parser.parse_args()
+
+    input_filename = args.path
+    if not input_filename.endswith(".asm") or not Path(input_filename).is_file():
+        print(f"Error: File '{input_filename}' not found or not an .asm file.")
+        sys.exit(1)
+
+    assembler = Assembler.from_file(input_filename)
+    if args.binary:
+        assembler.write_binary(input_filename[:-4] + ".bin")
+    else:
+        assembler.write_hack(input_filename[:-4] + ".hack")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent
+
+# the modules whose code decides what the compiler and the translator emit
+compiler_modules = ("JackTokenizer.py", "CompilationEngine.py", "SymbolTable.py", "VMWriter.py", "VMOptimizer.py", "Emitter.py")
+translator_modules = ("VMTranslator.py", "Emitter.py")
+
+
+@lru_cache(maxsize=None)
+def code_version(modules: Tuple[str, ...]) -> str:
+    """Hash of the given modules' source, so that entries written by an older compiler or translator are never used."""
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update((ROOT / module).read_bytes())
+
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Persistent cache of compiled .vm and translated .asm code, one JSON file per entry, named by the SHA-256 of
+    everything the output depends on: the tool's code version, its options and the input file's content.
+    Entries are written atomically, so several compiler processes can share a cache directory. evict() keeps
+    the directory under max_bytes by removing the least recently used entries.
+    """
+
+    default_directory = Path.home() / ".cache" / "nand2tetris"
+    default_max_bytes = 64 * 1024 * 1024
+
+    def __init__(self, directory: str = "", max_bytes: int = default_max_bytes):
+        self.directory = Path(directory) if directory else self.default_directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+
+    @staticmethod
+    def key(*parts) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode()
+            # length-prefixed, so that no two different part lists hash the same bytes
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+
+        return digest.hexdigest()
+
+
+    def path(self, key: str) -> Path:
+        return self.directory / f'{key}.json'
+
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self.path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # the modification time orders entries for eviction
+        with_missing_ok(os.utime, path)
+        self.hits += 1
+        return entry
+
+
+    def put(self, key: str, entry: dict) -> None:
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file, separators=(",", ":"))
+
+        os.replace(temporary, self.path(key))
+
+
+    def size(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.glob("*.json"))
+
+
+    def evict(self) -> None:
+        entries = []
+        for path in self.directory.glob("*.json"):
+            stat = with_missing_ok(path.stat)
+            if stat is not None:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            with_missing_ok(path.unlink)
+            total -= size
+            self.evicted += 1
+
+
+    def report(self, name: str) -> None:
+        print(f'{name} cache: {self.hits} hits, {self.misses} misses, {self.evicted} evicted '
+              f'({self.size() / 1024:.0f} KB in {self.directory})')
+
+
+def with_missing_ok(function, *args):
+    """Runs function(*args), ignoring entries another process has just evicted."""
+    try:
+        return function(*args)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,214 @@
+import argparse
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Assembler import Assembler
+
+# a compiled basic block: fn(R, A, D) -> (next_pc, A, D), number of instructions, whether it loops on itself forever
+Block = Tuple[Callable, int, bool]
+
+class CPUEmulator:
+
+    ram_size = 32768
+    screen = 16384
+    keyboard = 24576
+    screen_words = 8192
+
+    # comp mnemonic -> Python expression over D and y (A or M), on unsigned 16-bit values
+    comp_expressions = {
+        "0": "0", "1": "1", "-1": "65535",
+        "D": "D", "y": "y", "!D": "D ^ 65535", "!y": "y ^ 65535", "-D": "-D & 65535", "-y": "-y & 65535",
+        "D+1": "(D + 1) & 65535", "y+1": "(y + 1) & 65535", "D-1": "(D - 1) & 65535", "y-1": "(y - 1) & 65535",
+        "D+y": "(D + y) & 65535", "D-y": "(D - y) & 65535", "y-D": "(y - D) & 65535", "D&y": "D & y", "D|y": "D | y",
+    }
+
+    # jump bits -> condition on the unsigned result v (v >= 32768 means negative)
+    jump_conditions = {
+        1: "0 < v < 32768", 2: "v == 0", 3: "v < 32768", 4: "v >= 32768", 5: "v != 0", 6: "v == 0 or v >= 32768", 7: "True",
+    }
+
+
+    def __init__(self, rom: List[int], symbols: Optional[Dict[str, int]] = None):
+        self.rom = rom
+        self.symbols = symbols or {}
+        self.ram = [0] * self.ram_size
+        self.pc = 0
+        self.a = 0
+        self.d = 0
+        self.cycles = 0
+        # basic blocks are decoded and compiled to Python the first time execution reaches their first address
+        self.blocks: Dict[int, Block] = {}
+        self.comp_by_bits = self.decode_comp_table()
+
+
+    @classmethod
+    def from_file(cls, filename: str) -> "CPUEmulator":
+        """Loads a .hack (text), .bin (packed big-endian words) or .asm program."""
+        if filename.endswith(".asm"):
+            assembler = Assembler.from_file(filename)
+            return cls(assembler.assemble(), assembler.symbols)
+
+        if filename.endswith(".bin"):
+            words = array("H", Path(filename).read_bytes())
+            if sys.byteorder == "little":
+                words.byteswap()
+            return cls(list(words))
+
+        with open(filename, "r") as file:
+            return cls([int(line, 2) for line in file.read().split()])
+
+
+    @classmethod
+    def decode_comp_table(cls) -> Dict[int, Tuple[str, bool]]:
+        """comp bits -> (Python expression over D and y, whether y is M rather than A)"""
+        table = {}
+        for comp, bits in Assembler.comp_codes.items():
+            a_bit = bits[0] == "1"
+            generic = comp.replace("M", "y") if a_bit else comp.replace("A", "y")
+            table[int(bits, 2)] = (cls.comp_expressions[generic], a_bit)
+
+        return table
+
+
+    def compile_block(self, start: int) -> Block:
+        lines = ["def block(R, A, D):"]
+        known_a = None # value of A when it is known at compile time, so that M can index R directly
+        pc = start
+        next_pc = None
+
+        while pc < len(self.rom):
+            word = self.rom[pc]
+            pc += 1
+
+            if word < 0x8000:
+                lines.append(f'    A = {word}')
+                known_a = word
+                continue
+
+            comp_bits, dest, jump = (word >> 6) & 0x7F, (word >> 3) & 0x7, word & 0x7
+            if comp_bits not in self.comp_by_bits:
+                raise ValueError(f'invalid instruction {word:016b} at address {pc - 1}')
+
+            expression, uses_m = self.comp_by_bits[comp_bits]
+            memory = f'R[{known_a}]' if known_a is not None else "R[A]"
+            y = memory if uses_m else "A"
+            lines.append(f'    v = {expression.replace("y", y)}')
+
+            # M is written through, and a jump goes to, the old value of A, before A itself is assigned
+            target = known_a if known_a is not None else "A"
+            if jump and dest & 4 and known_a is None:
+                lines.append("    target = A")
+                target = "target"
+
+            if dest & 1:
+                lines.append(f'    {memory} = v')
+            if dest & 2:
+                lines.append("    D = v")
+            if dest & 4:
+                lines.append("    A = v")
+                known_a = None
+
+            if jump:
+                lines.append(f'    if {self.jump_conditions[jump]}:')
+                lines.append(f'        return {target}, A, D')
+                next_pc = target if jump == 7 and isinstance(target, int) else None
+                break
+
+        lines.append(f'    return {pc}, A, D')
+
+        namespace = {}
+        exec("\n".join(lines), namespace)
+
+        # "@X, 0;JMP" at X is how Hack programs stop
+        halts = next_pc == start and pc - start == 2 and self.rom[start] == start
+        block = (namespace["block"], pc - start, halts)
+        self.blocks[start] = block
+        return block
+
+
+    def run(self, max_cycles: int, stop_at: Optional[int] = None) -> int:
+        """
+        Runs until max_cycles more instructions have executed, the program halts in an "@X, 0;JMP" loop at X,
+        or execution reaches the address stop_at. Returns the number of instructions executed.
+        """
+        R, blocks = self.ram, self.blocks
+        pc, A, D = self.pc, self.a, self.d
+        limit = self.cycles + max_cycles
+        cycles = self.cycles
+
+        while cycles < limit and pc != stop_at:
+            block = blocks.get(pc)
+            if block is None:
+                if pc >= len(self.rom):
+                    break
+                block = self.compile_block(pc)
+
+            function, length, halts = block
+            if halts:
+                break
+
+            try:
+                pc, A, D = function(R, A, D)
+            except IndexError:
+                self.pc, self.a, self.d, self.cycles = pc, A, D, cycles
+                raise RuntimeError(f'memory access out of range in the block at ROM address {pc}') from None
+            cycles += length
+
+        executed = cycles - self.cycles
+        self.pc, self.a, self.d, self.cycles = pc, A, D, cycles
+        return executed
+
+
+    def press(self, key: int) -> None:
+        """Holds down a key (its Hack character code), or releases all keys with 0."""
+        self.ram[self.keyboard] = key
+
+
+    def dump_screen(self, output_filename: str) -> None:
+        write_screen(self.ram[self.screen:self.screen + self.screen_words], output_filename)
+
+
+def write_screen(words: List[int], output_filename: str) -> None:
+    """Writes the 512x256 screen words as a binary PBM image (the Hack screen stores the leftmost pixel in bit 0)."""
+    reversed_bits = bytes(int(f'{i:08b}'[::-1], 2) for i in range(256))
+    pixels = bytearray()
+    for word in words:
+        pixels.append(reversed_bits[word & 0xFF])
+        pixels.append(reversed_bits[(word >> 8) & 0xFF])
+
+    with open(output_filename, "wb") as file:
+        file.write(b"P4\n512 256\n" + bytes(pixels))
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python CPUEmulator.py [filename.hack|filename.bin|filename.asm] [--cycles N] [--screen out.pbm]")
+    parser.add_argument("path")
+    parser.add_argument("--cycles", type=int, default=10_000_000, help="maximum number of instructions to run")
+    parser.add_argument("--screen", help="write the screen to this .pbm file when the run ends")
+    args = parser.parse_args()
+
+    if not Path(args.path).is_file():
+        print(f"Error: File '{args.path}' not found.")
+        sys.exit(1)
+
+    emulator = CPUEmulator.from_file(args.path)
+
+    # programs built with the OS end in Sys.halt, which loops forever
+    stop_at = emulator.symbols.get("Sys.halt")
+
+    start = time.perf_counter()
+    cycles = emulator.run(args.cycles, stop_at)
+    elapsed = time.perf_counter() - start
+
+    status = "halted" if emulator.pc == stop_at or emulator.blocks.get(emulator.pc, (None, 0, False))[2] else "stopped"
+    print(f'{status} after {cycles} cycles in {elapsed:.2f} s ({cycles / elapsed / 1e6:.2f} M instructions/s)')
+
+    if args.screen:
+        emulator.dump_screen(args.screen)
+
+
+if __name__ == "__main__":
+    main()
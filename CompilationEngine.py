@@ -1,27 +1,40 @@
-from typing import List, Union
-from xml.dom.minidom import parseString
+from typing import List, Optional, Union
 import xml.etree.ElementTree as ET
 
+from JackTokenizer import Token
 from SymbolTable import SymbolTable
+from VMOptimizer import fold_binary, to_word
 from VMWriter import VMWriter
 
 class CompilationEngine:
 
-    token_idx = 0
-    root = None
-    node_stack = []
-
     op_symbols = { "+", "-", "*", "/", "&", "|", "<", ">", "=" }
     unary_op = { "-", "~" }
     keyword_constants = ["true", "false", "null", "this"]
-
-    loop_counter = 0
-
-    def  __init__(self, filename: str):
-        tokens_tree = ET.parse(filename)
-        self.output_filename = filename[:-5] + ".vm"
-        self.tokens_root = tokens_tree.getroot()
-        self.tokens_count = len(self.tokens_root)
+    keyword_values = { "true": -1, "false": 0, "null": 0 }
+
+    # (op, constant) pairs that leave the other operand unchanged
+    right_identities = { ("+", 0), ("-", 0), ("|", 0), ("&", -1), ("*", 1), ("/", 1) }
+    left_identities = { ("+", 0), ("|", 0), ("&", -1), ("*", 1) }
+
+    def  __init__(self, tokens: List[Token], output_filename: str = "", optimize: bool = False, intern_strings: bool = False,
+                  source_map: bool = False):
+        # all parsing state lives on the instance, so separate engines never share anything
+        self.token_idx = 0
+        self.node_stack = []
+        self.loop_counter = 0
+
+        self.output_filename = output_filename
+        self.optimize = optimize
+        self.source_map = source_map
+
+        # string literal -> index of the static that holds the shared String object
+        self.intern_strings = intern_strings
+        self.string_pool = {}
+
+        self.tokens = [(tag, value) for tag, value, _ in tokens]
+        self.token_lines = [line for _, _, line in tokens]
+        self.tokens_count = len(self.tokens)
         self.symbol_table = SymbolTable()
 
 
@@ -29,11 +42,7 @@ class CompilationEngine:
         if not idx:
             idx = self.token_idx
 
-        tag, value = self.tokens_root[idx].tag, self.tokens_root[idx].text
-        if tag != "stringConstant":
-            value = value.strip()
-        
-        return (tag, value)
+        return self.tokens[idx]
 
 
     def next_token(self) -> None:
@@ -101,6 +110,7 @@ class CompilationEngine:
 
 
     def compile_subroutine(self, token: (str, str), subroutine_type: str) -> None:
+        self.writer.line = self.token_lines[self.token_idx]
         self.add_parent_node("subroutineDec")
         self.next_token()
         _, return_type = token = self.get_token()
@@ -163,9 +173,12 @@ class CompilationEngine:
 
     def compile_statements(self) -> None:
         self.add_parent_node("statements")
+        # code is mapped to the line its statement starts on; the enclosing statement's own code resumes after
+        enclosing_line = self.writer.line
 
         while self.get_parent_node() == "statements":
             _, property_type = token = self.get_token()
+            self.writer.line = self.token_lines[self.token_idx]
 
             if token == ("symbol", "}"):
                 self.pop_parent_node()
@@ -185,6 +198,8 @@ class CompilationEngine:
                     print("Statement not implemented yet:", property_type)
                 break
 
+        self.writer.line = enclosing_line
+
     
     def compile_while(self, token: (str, str)) -> None:
         self.add_parent_node("whileStatement")
@@ -370,24 +385,114 @@ class CompilationEngine:
         return n_args
 
 
-    def compile_expression(self, token: (str, str)) -> None:
+    def compile_expression(self, token: (str, str)) -> Optional[int]:
+        """Compiles term (op term)*, left to right. Returns the value of the expression if it is known at compile time."""
         self.add_parent_node("expression")
-        self.compile_term(token)
+        start = self.writer.mark()
+        value = self.compile_term(token)
         self.next_token()
 
-        tag, value = token = self.get_token()
-        if tag == "symbol" and value in self.op_symbols:
+        tag, op = token = self.get_token()
+        while tag == "symbol" and op in self.op_symbols:
             self.next_token()
-            self.compile_term(self.get_token())
+            right_start = self.writer.mark()
+            right_value = self.compile_term(self.get_token())
             self.next_token()
-            if value == "*":
-                self.writer.call("Math.multiply", 2)
-            elif value == "/":
-                self.writer.call("Math.divide", 2)
-            else:
-                self.writer.perform_operation(value)
+
+            value = self.compile_operation(op, start, value, right_start, right_value)
+            tag, op = token = self.get_token()
 
         self.pop_parent_node()
+        return value
+
+
+    def compile_operation(self, op: str, start: int, left_value: Optional[int], right_start: int, right_value: Optional[int]) -> Optional[int]:
+        """
+        Emits the code for "left op right", where the code of left starts at start and the code of right at right_start.
+        Constant operands are folded, and multiplications by 0, 1, 2 and 4 are reduced to cheaper code.
+        """
+        if left_value is not None and right_value is not None:
+            value = self.fold_operation(op, left_value, right_value)
+            if value is not None:
+                self.writer.truncate(start)
+                self.writer.push_constant(value)
+                return value
+
+        # identities: drop the constant operand and keep the other one as it is
+        if right_value is not None and (op, right_value) in self.right_identities:
+            self.writer.truncate(right_start)
+            return left_value
+        if left_value is not None and (op, left_value) in self.left_identities:
+            self.writer.truncate(start, right_start)
+            return right_value
+
+        if op == "-" and left_value == 0:
+            self.writer.truncate(start, right_start)
+            self.writer.perform_operation("neg")
+            return None
+
+        # each doubling of an operand that is more than a single push goes through temp 1, so past 4 the
+        # doublings take more code than the call of Math.multiply they replace
+        factor = right_value if right_value is not None else left_value
+        if op == "*" and factor is not None and abs(factor) in (0, 1, 2, 4):
+            # drop the constant operand, which leaves the code of the other one starting at start
+            if right_value is not None:
+                self.writer.truncate(right_start)
+            else:
+                self.writer.truncate(start, right_start)
+
+            if factor == 0:
+                if not any(code.startswith("call ") for code in self.writer.emitted_since(start)):
+                    self.writer.truncate(start)
+                    self.writer.push_constant(0)
+                    return 0
+
+                # the operand has side effects, so it is still evaluated
+                self.writer.push_constant(0)
+                self.writer.perform_operation("&")
+                return None
+
+            self.double(start, abs(factor).bit_length() - 1)
+            if factor < 0:
+                self.writer.perform_operation("neg")
+            return None
+
+        if op == "*":
+            self.writer.call("Math.multiply", 2)
+        elif op == "/":
+            self.writer.call("Math.divide", 2)
+        else:
+            self.writer.perform_operation(op)
+
+        return None
+
+
+    def fold_operation(self, op: str, x: int, y: int) -> Optional[int]:
+        if op == "*":
+            return to_word(x * y)
+        if op == "/":
+            # Math.divide rounds towards zero, and division by zero is left for run time to report
+            if y == 0:
+                return None
+            quotient = abs(x) // abs(y)
+            return to_word(-quotient if (x < 0) != (y < 0) else quotient)
+
+        return fold_binary(VMWriter.operations[op], x, y)
+
+
+    def double(self, start: int, times: int) -> None:
+        """Multiplies the value computed by the code since start by 2 ** times, by repeated addition."""
+        for _ in range(times):
+            code = self.writer.emitted_since(start)
+            if len(code) == 1 and code[0].startswith("push "):
+                # a single push has no side effects and can simply be repeated
+                self.writer.write(code[0])
+            else:
+                self.writer.pop_to(("", "", "temp", 1))
+                self.writer.push_variable(("", "", "temp", 1))
+                self.writer.push_variable(("", "", "temp", 1))
+
+            self.writer.perform_operation("+")
 
 
     def compile_subroutine_call(self, token: (str, str)) -> None:
@@ -423,17 +528,23 @@ class CompilationEngine:
         self.writer.call(subroutine_name, n_args, self.class_name)
 
     
-    def compile_term(self, token: (str, str)) -> None:
+    def compile_term(self, token: (str, str)) -> Optional[int]:
+        """Compiles a term and returns its value if it is a constant."""
         self.add_parent_node("term")
         tag, value = token
         next_tag, next_value = next_token = self.get_token(self.token_idx + 1)
+        constant = None
 
         if tag == "integerConstant":
             self.writer.push(tag, value)
+            constant = int(value)
+        elif tag == "stringConstant" and self.intern_strings:
+            self.compile_interned_string(value)
         elif tag == "stringConstant":
-            self.writer.push_string(value[1:-1])
+            self.writer.push_string(value)
         elif tag == "keyword" and value in self.keyword_constants:
             self.writer.push_keyword_constant(value)
+            constant = self.keyword_values.get(value)
         elif tag == "identifier" and next_token == ("symbol", "."):
             self.compile_subroutine_call(token)
         elif tag == "identifier" and next_token == ("symbol", "("):
@@ -459,25 +570,42 @@ class CompilationEngine:
         
         elif token == ("symbol", "("):
             self.next_token()
-            self.compile_expression(self.get_token())
+            constant = self.compile_expression(self.get_token())
 
             token = self.get_token()
             assert token == ("symbol", ")")
 
         elif tag == "symbol" and value in self.unary_op:
+            start = self.writer.mark()
             self.next_token()
-            self.compile_term(self.get_token())
+            operand = self.compile_term(self.get_token())
 
-            if value == "-":
+            if operand is not None:
+                constant = to_word(-operand if value == "-" else ~operand)
+                self.writer.truncate(start)
+                self.writer.push_constant(constant)
+            elif value == "-":
                 self.writer.perform_operation("neg")
             else:
                 self.writer.perform_operation(value)
 
         self.pop_parent_node()
+        return constant
+
+
+    def compile_interned_string(self, value: str) -> None:
+        # the pool's statics come after the class's own, which are all declared before the first subroutine
+        if value not in self.string_pool:
+            self.string_pool[value] = self.symbol_table.get_statics_count() + len(self.string_pool)
+
+        built_label = self.loop_counter
+        self.loop_counter += 1
+
+        self.writer.push_interned_string(value, self.string_pool[value], f'L{built_label}')
 
 
     def compile(self) -> None:
-        self.writer = VMWriter(self.output_filename)
+        self.writer = VMWriter(self.output_filename, self.optimize, self.source_map)
         _, initial_value = self.get_token()
         assert initial_value == "class"
 
@@ -0,0 +1,52 @@
+from pathlib import Path
+from typing import Iterable, List
+
+
+class Emitter:
+    """
+    Output lines for VMWriter and Translate. Lines are collected in a list and written to the output file in
+    chunks of at least chunk_lines lines, as the text of the whole chunk joined in one go, rather than with a
+    print() or write() per line. Without an output filename every line stays in self.lines, see getvalue().
+    """
+
+    chunk_lines = 1 << 16
+
+    def __init__(self, output_filename: str = ""):
+        self.lines: List[str] = []
+        self.file = None
+
+        if output_filename:
+            file = Path(output_filename)
+            if file.is_file():
+                file.unlink()
+
+            self.file = open(output_filename, "w")
+
+
+    def write(self, line: str) -> None:
+        self.lines.append(line)
+
+
+    def extend(self, lines: Iterable[str]) -> None:
+        self.lines += lines
+        if self.file is not None and len(self.lines) >= self.chunk_lines:
+            self.flush()
+
+
+    def flush(self) -> None:
+        if self.file is not None and self.lines:
+            self.file.write("\n".join(self.lines))
+            self.file.write("\n")
+            # cleared in place: Translate.instructions is the same list
+            self.lines.clear()
+
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+    def getvalue(self) -> str:
+        return "\n".join(self.lines) + "\n" if self.lines else ""
@@ -2,7 +2,13 @@ import sys
 from pathlib import Path
 
 from CompilationEngine import CompilationEngine
-from JackTokenizer import tokenize
+from JackTokenizer import tokenize, write_xml
+
+def analyze(input_filename: str) -> None:
+    tokens = tokenize(input_filename)
+    write_xml(tokens, input_filename)
+    CompilationEngine(tokens, input_filename[:-5] + ".vm").compile()
+
 
 def main():
     if len(sys.argv) != 2:
@@ -17,20 +23,18 @@ def main():
             print(f"Error: File '{input_filename}' not found.")
             sys.exit(1)
 
-        tokenized_file = tokenize(input_filename)
-        CompilationEngine(tokenized_file).compile()
+        analyze(input_filename)
             
     elif Path(main_arg).is_dir():
         directory = main_arg
         for file in Path(directory).iterdir():
             if file.name.endswith(".jack"):
                 input_filename = f'{directory}/{file.name}'
-                tokenized_file = tokenize(input_filename)
-                CompilationEngine(tokenized_file).compile()
+                analyze(input_filename)
                 
     else:
         print(f"Error: Input must be a either a filename with .jack extension or a directory")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,15 +1,110 @@
+import argparse
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import List, Optional, Tuple
 
+from BuildCache import BuildCache, code_version, compiler_modules
 from CompilationEngine import CompilationEngine
-from JackTokenizer import tokenize
+from JackTokenizer import scan, tokenize, write_xml
+
+def compile_source(source: str, optimize: bool = False, intern_strings: bool = False) -> str:
+    """Compiles the source of one Jack class and returns its VM code. Safe to call from several threads at once."""
+    engine = CompilationEngine(scan(source), optimize=optimize, intern_strings=intern_strings)
+    engine.compile()
+    return engine.writer.getvalue()
+
+
+def compile_file(input_filename: str, xml: bool = False, optimize: bool = False, intern_strings: bool = False,
+                 source_map: bool = False, cache: Optional[BuildCache] = None) -> Tuple[float, Tuple[int, int], bool]:
+    """Returns the compile time, the (emitted, written) VM instruction counts and whether the output came from the cache."""
+    start = time.perf_counter()
+    output_filename = input_filename[:-5] + ".vm"
+
+    tokens = tokenize(input_filename) if xml else None
+    if xml:
+        write_xml(tokens, input_filename)
+
+    if cache is not None:
+        key = BuildCache.key("jack", code_version(compiler_modules), optimize, intern_strings, source_map,
+                             Path(input_filename).name, Path(input_filename).read_bytes())
+        entry = cache.get(key)
+        if entry is not None:
+            write_compiled(output_filename, entry)
+            return time.perf_counter() - start, tuple(entry["counts"]), True
+
+    engine = CompilationEngine(tokens if xml else tokenize(input_filename), output_filename, optimize, intern_strings, source_map)
+    engine.compile()
+
+    if cache is not None:
+        source_map_text = Path(output_filename + ".map").read_text() if source_map else None
+        cache.put(key, { "vm": Path(output_filename).read_text(), "map": source_map_text,
+                         "counts": engine.writer.instruction_counts })
+
+    return time.perf_counter() - start, engine.writer.instruction_counts, False
+
+
+def write_compiled(output_filename: str, entry: dict) -> None:
+    Path(output_filename).write_text(entry["vm"])
+    if entry["map"] is not None:
+        Path(output_filename + ".map").write_text(entry["map"])
+
+
+def report_optimization(input_filenames: List[str], instruction_counts: List[Tuple[int, int]]) -> None:
+    for input_filename, (before, after) in zip(input_filenames, instruction_counts):
+        print(f'{input_filename}: {before} -> {after} VM instructions')
+
+    before, after = sum(counts[0] for counts in instruction_counts), sum(counts[1] for counts in instruction_counts)
+    if len(input_filenames) > 1 and before:
+        print(f'Total: {before} -> {after} VM instructions ({100 * (before - after) / before:.1f}% fewer)')
+
+
+def compile_directory(directory: str, jobs: int, xml: bool = False, optimize: bool = False, intern_strings: bool = False,
+                      source_map: bool = False, cache: Optional[BuildCache] = None) -> None:
+    input_filenames = sorted(f'{directory}/{file.name}' for file in Path(directory).iterdir() if file.name.endswith(".jack"))
+
+    start = time.perf_counter()
+
+    # every class compiles independently into its own .vm file, so they can be spread over worker processes
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        compile_one = partial(compile_file, xml=xml, optimize=optimize, intern_strings=intern_strings, source_map=source_map, cache=cache)
+        results = list(executor.map(compile_one, input_filenames))
+
+    # the workers looked entries up in their own copies of the cache
+    if cache is not None:
+        cache.hits += sum(result[2] for result in results)
+        cache.misses += sum(not result[2] for result in results)
+
+    elapsed = time.perf_counter() - start
+    timings = [result[0] for result in results]
+
+    for input_filename, file_elapsed, (_, _, cached) in zip(input_filenames, timings, results):
+        print(f'{input_filename}: {file_elapsed * 1000:.1f} ms{" (cached)" if cached else ""}')
+    print(f'Compiled {len(input_filenames)} files in {elapsed * 1000:.1f} ms ({sum(timings) * 1000:.1f} ms of compile time)')
+
+    if optimize:
+        report_optimization(input_filenames, [result[1] for result in results])
+
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python JackCompiler.py [filename|directory]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(usage="python JackCompiler.py [filename|directory] [--xml] [--jobs N] [--optimize] [--intern-strings] [--source-map] [--cache [DIR]]")
+    parser.add_argument("path")
+    parser.add_argument("--xml", action="store_true", help="also dump the tokens of each class to <Name>T.xml")
+    parser.add_argument("--jobs", type=int, help="compile the classes of a directory in N processes (0 = one per CPU) and report per-file timing")
+    parser.add_argument("--optimize", action="store_true", help="run the peephole optimizer over the VM code and report instruction counts")
+    parser.add_argument("--intern-strings", action="store_true",
+                        help="build each distinct string literal of a class once and reuse it (programs must not dispose or modify literals)")
+    parser.add_argument("--source-map", action="store_true", help="write <Name>.vm.map with the Jack line of each VM instruction")
+    parser.add_argument("--cache", nargs="?", const=str(BuildCache.default_directory),
+                        help=f"reuse the output of classes compiled before with the same source and options (default {BuildCache.default_directory})")
+    parser.add_argument("--cache-size", type=int, default=BuildCache.default_max_bytes // 2**20, help="size limit of the cache in MB")
+    args = parser.parse_args()
+    cache = BuildCache(args.cache, args.cache_size * 2**20) if args.cache else None
 
-    main_arg = sys.argv[1]
+    main_arg = args.path
 
     if main_arg.endswith(".jack"):
         input_filename = main_arg
@@ -17,20 +112,32 @@ def main():
             print(f"Error: File '{input_filename}' not found.")
             sys.exit(1)
 
-        tokenized_file = tokenize(input_filename)
-        CompilationEngine(tokenized_file).compile()
+        _, instruction_counts, _ = compile_file(input_filename, args.xml, args.optimize, args.intern_strings, args.source_map, cache)
+        if args.optimize:
+            report_optimization([input_filename], [instruction_counts])
             
+    elif Path(main_arg).is_dir() and args.jobs is not None:
+        compile_directory(main_arg, args.jobs, args.xml, args.optimize, args.intern_strings, args.source_map, cache)
+
     elif Path(main_arg).is_dir():
         directory = main_arg
-        for file in Path(directory).iterdir():
+        input_filenames, instruction_counts = [], []
+        for file in sorted(Path(directory).iterdir()):
             if file.name.endswith(".jack"):
                 input_filename = f'{directory}/{file.name}'
-                tokenized_file = tokenize(input_filename)
-                CompilationEngine(tokenized_file).compile()
+                input_filenames.append(input_filename)
+                instruction_counts.append(compile_file(input_filename, args.xml, args.optimize, args.intern_strings, args.source_map, cache)[1])
+
+        if args.optimize:
+            report_optimization(input_filenames, instruction_counts)
                 
     else:
         print(f"Error: Input must either be a .jack file or a directory")
         sys.exit(1)
 
+    if cache is not None:
+        cache.evict()
+        cache.report("Compile")
+
 if __name__ == "__main__":
     main()
@@ -1,57 +1,64 @@
+import re
 import sys
-from pathlib import Path
+from collections import namedtuple
 from typing import List
 
-symbols = {
-    "{", "}", "(", ")", "[", "]", ".", ",", ";", "+", "-", "*", "/", "&", "|", "<", ">", "=", "~"
-}
+# tag is one of keyword/symbol/identifier/integerConstant/stringConstant, line is the 1-based source line
+Token = namedtuple("Token", ["tag", "value", "line"])
 
 keywords = {
     "class", "constructor", "function", "method", "field", "static", "var", "int", "char", "boolean", "void", "true", "false", "null", "this", "let", "do", "if", "else", "while", "return"
 }
 
-def remove_inline_comments(line: str) -> str:
-    n = len(line)
-    for i in range(n):
-        if i+1 < n and line[i:i+2] == "//":
-            return line[:i].strip()
-
-    return line
-
-
-def remove_doc_comments(code: str) -> str:
-    i, n = 0, len(code)
-    is_comment = False
-    result = ""
-
-    while i < n:
-        if not is_comment and i+2 < n and code[i:i+3] == "/**":
-            is_comment = True
-        elif i+1 < n and code[i:i+2] == "*/":
-            is_comment = False
-            i += 1
-        elif not is_comment:
-            result += code[i]
-
-        i += 1
-
-    return result
-
-
-def remove_comments(filename: str) -> str:
+# a single pass over the raw source: comments and whitespace are matched (and skipped) by the same
+# regex as the tokens, so "//" inside a string literal is never mistaken for a comment
+token_pattern = re.compile(r"""
+      (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+    | (?P<word>[A-Za-z_]\w*)
+    | (?P<symbol>[{}()\[\].,;+\-*/&|<>=~])
+    | (?P<integerConstant>\d+)
+    | (?P<stringConstant>"[^"\n]*")
+    | (?P<unterminatedComment>/\*)
+    | (?P<unterminatedString>")
+    | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+def scan(source: str) -> List[Token]:
+    tokens = []
+    append = tokens.append
+    line, line_start = 1, 0
+
+    for match in token_pattern.finditer(source):
+        kind = match.lastgroup
+        if kind == "skip" or kind == "other":
+            continue
+
+        # line numbers are only computed for real tokens, by counting the newlines skipped since the last one
+        start = match.start()
+        line += source.count("\n", line_start, start)
+        line_start = start
+        value = match.group()
+
+        if kind == "word":
+            append(Token("keyword" if value in keywords else "identifier", value, line))
+        elif kind == "symbol" or kind == "integerConstant":
+            append(Token(kind, value, line))
+        elif kind == "stringConstant":
+            append(Token(kind, value[1:-1], line))
+        elif kind == "unterminatedComment":
+            print(f"Syntax error: unterminated comment on line {line}")
+            sys.exit(1)
+        else:
+            print(f"Syntax error: unterminated string literal on line {line}")
+            sys.exit(1)
+
+    return tokens
+
+
+def tokenize(filename: str) -> List[Token]:
     with open(filename, "r") as file:
-        lines = file.read().splitlines()
-        cleaned_code = ""
-
-        for line in lines:
-            stripped_line = line.strip()
-            if not stripped_line or stripped_line.startswith("//"):
-                continue
-
-            cleaned_code += remove_inline_comments(stripped_line)
-        
-        cleaned_code = remove_doc_comments(cleaned_code)
-        return cleaned_code
+        return scan(file.read())
 
 
 def write(file_stream, type: str, value: str = "") -> None:
@@ -61,72 +68,18 @@ def write(file_stream, type: str, value: str = "") -> None:
         print(f"<{type}>", file=file_stream)
 
 
-def tokenize(filename: str) -> str:
+def write_xml(tokens: List[Token], filename: str) -> str:
+    """Dumps the tokens of a .jack file to <Name>T.xml. Only used for debugging the tokenizer."""
     output_filename = filename[:-5] + "T" + ".xml"
+    encoded_symbols = { "&": "&amp;", "<": "&lt;", ">": "&gt;" }
 
-    # delete output file if it already exists
-    file = Path(output_filename)
-    if file.is_file():
-        file.unlink()
-
-    contents = remove_comments(filename)
-
-    with open(output_filename, "a") as file_stream:
+    with open(output_filename, "w") as file_stream:
         write(file_stream, "tokens")
-        
-        i, n = 0, len(contents)
-        while i < n:
-            char = contents[i]
-
-            if char == '"':
-                i += 1
-                j = contents.find('"', i)
-                if j == -1:
-                    print("Syntax error: unterminated string literal")
-                    sys.exit(1)
-
-                write(file_stream, "stringConstant", contents[i:j])
-                i = j + 1 # add 1 to skip the trailing '"'
-                continue
-
-            if char.isdigit():
-                j = i
-                while j < n and contents[j].isdigit():
-                    j += 1
-
-                write(file_stream, "integerConstant", contents[i:j])
-                i = j
-                continue
-
-            # this is to check if a string is a class or identifier. An identifier can contain digits, 
-            # but it cannot start with a digit (hence isalpha() check in if-statement and isalnum() check in while-loop)
-            if char.isalpha() or char == "_":
-                j = i
-                while j < n and (contents[j].isalnum() or char == "_"):
-                    j += 1
-                
-                value = contents[i:j]
-                if value in keywords:
-                    write(file_stream, "keyword", value)
-                else:
-                    write(file_stream, "identifier", value)
-                
-                i = j
-                continue
-                
-            if char in symbols:
-                encoded = char
-
-                if char == "&":
-                    encoded = "&amp;"
-                elif char == "<":
-                    encoded = "&lt;"
-                elif char == ">":
-                    encoded = "&gt;"
-                
-                write(file_stream, "symbol", encoded)
-            
-            i += 1
+
+        for tag, value, _ in tokens:
+            if tag == "symbol":
+                value = encoded_symbols.get(value, value)
+            write(file_stream, tag, value)
 
         write(file_stream, "/tokens")
 
@@ -0,0 +1,374 @@
+"""
+Python implementations of the Jack OS classes, for VMEmulator. The emulator uses them for every function the
+loaded .vm files do not define, so a program runs on its own or with any mix of the bundled .jack OS classes.
+
+Natives reach other OS classes through VMEmulator.invoke, which prefers the loaded .vm implementation, e.g.
+String.new allocates with whichever Memory.alloc is in use. Output is text: characters go to an output stream
+rather than to the screen, and Keyboard.readChar/readLine/readInt read lines from an input stream.
+"""
+import math
+from typing import Callable, Dict, List
+
+from VMOptimizer import to_word
+
+
+class NativeOS:
+
+    heap_base = 2048
+    heap_end = 16384
+    screen = 16384
+    keyboard = 24576
+
+    # Sys.error codes of the standard OS
+    division_by_zero = 3
+    negative_square_root = 4
+    allocated_size_not_positive = 5
+    heap_overflow = 6
+    array_size_not_positive = 2
+    string_length_negative = 14
+    string_index_out_of_bounds = 15
+    string_full = 17
+    string_empty = 18
+    string_too_short_for_int = 19
+
+    def __init__(self, vm: "VMEmulator", output, input):
+        self.vm = vm
+        self.ram = vm.ram
+        self.output = output
+        self.input = input
+        self.at_line_start = True
+        self.black = True
+        self.reset_heap()
+
+
+    def functions(self) -> Dict[str, Callable]:
+        return {
+            "Sys.init": self.sys_init, "Sys.halt": self.vm.halt, "Sys.error": self.sys_error, "Sys.wait": self.nothing,
+
+            "Memory.init": self.reset_heap, "Memory.peek": self.memory_peek, "Memory.poke": self.memory_poke,
+            "Memory.alloc": self.memory_alloc, "Memory.deAlloc": self.memory_dealloc,
+
+            "Math.init": self.nothing, "Math.abs": self.math_abs, "Math.multiply": self.math_multiply,
+            "Math.divide": self.math_divide, "Math.min": min, "Math.max": max, "Math.sqrt": self.math_sqrt,
+            # not part of the standard OS, but a public function of the bundled Math
+            "Math.pow": self.math_pow,
+
+            "Array.new": self.array_new, "Array.dispose": self.array_dispose,
+
+            "String.new": self.string_new, "String.dispose": self.array_dispose, "String.length": self.string_length,
+            "String.charAt": self.string_char_at, "String.setCharAt": self.string_set_char_at,
+            "String.appendChar": self.string_append_char, "String.eraseLastChar": self.string_erase_last_char,
+            "String.intValue": self.string_int_value, "String.setInt": self.string_set_int,
+            "String.newLine": lambda: 128, "String.backSpace": lambda: 129, "String.doubleQuote": lambda: 34,
+
+            "Output.init": self.nothing, "Output.moveCursor": self.nothing, "Output.printChar": self.output_print_char,
+            "Output.printString": self.output_print_string, "Output.printInt": self.output_print_int,
+            "Output.println": self.output_println, "Output.backSpace": self.output_back_space,
+
+            "Screen.init": self.nothing, "Screen.clearScreen": self.screen_clear, "Screen.setColor": self.screen_set_color,
+            "Screen.drawPixel": self.screen_draw_pixel, "Screen.drawLine": self.screen_draw_line,
+            "Screen.drawRectangle": self.screen_draw_rectangle, "Screen.drawCircle": self.screen_draw_circle,
+            # not part of the standard OS either, but public functions of the bundled Screen
+            "Screen.drawHorizontalLine": lambda y, x1, x2: self.screen_draw_rectangle(min(x1, x2), y, max(x1, x2), y),
+            "Screen.drawVerticalLine": lambda x, y1, y2: self.screen_draw_rectangle(x, min(y1, y2), x, max(y1, y2)),
+
+            "Keyboard.init": self.nothing, "Keyboard.keyPressed": self.keyboard_key_pressed,
+            "Keyboard.readChar": self.keyboard_read_char, "Keyboard.readLine": self.keyboard_read_line,
+            "Keyboard.readInt": self.keyboard_read_int,
+        }
+
+
+    def nothing(self, *args) -> None:
+        pass
+
+
+    def error(self, code: int) -> None:
+        self.vm.invoke("Sys.error", [code])
+
+
+    # Sys
+
+    def sys_init(self) -> None:
+        for name in ("Memory", "Math", "Screen", "Output", "Keyboard"):
+            self.vm.invoke(f'{name}.init', [])
+
+        self.vm.invoke("Main.main", [])
+        self.vm.halt()
+
+
+    def sys_error(self, code: int) -> None:
+        self.write(f'ERR<{code}>')
+        self.vm.halt()
+
+
+    # Memory: blocks of each size are reused from a free list, other requests are cut from the top of the heap
+
+    def reset_heap(self) -> None:
+        self.heap_top = self.heap_base
+        self.block_sizes: Dict[int, int] = {}
+        self.free_blocks: Dict[int, List[int]] = {}
+
+
+    def memory_peek(self, address: int) -> int:
+        return self.ram[address]
+
+
+    def memory_poke(self, address: int, value: int) -> None:
+        self.ram[address] = value
+
+
+    def memory_alloc(self, size: int) -> int:
+        if size <= 0:
+            return self.error(self.allocated_size_not_positive)
+
+        free = self.free_blocks.get(size)
+        if free:
+            block = free.pop()
+        elif self.heap_top + size <= self.heap_end:
+            block = self.heap_top
+            self.heap_top += size
+        else:
+            return self.error(self.heap_overflow)
+
+        self.block_sizes[block] = size
+        return block
+
+
+    def memory_dealloc(self, block: int) -> None:
+        size = self.block_sizes.pop(block, None)
+        if size is not None:
+            self.free_blocks.setdefault(size, []).append(block)
+
+
+    # Math
+
+    def math_abs(self, x: int) -> int:
+        return to_word(abs(x))
+
+
+    def math_multiply(self, x: int, y: int) -> int:
+        return to_word(x * y)
+
+
+    def math_divide(self, x: int, y: int) -> int:
+        if y == 0:
+            return self.error(self.division_by_zero)
+
+        quotient = abs(x) // abs(y)
+        return to_word(quotient if (x < 0) == (y < 0) else -quotient)
+
+
+    def math_sqrt(self, x: int) -> int:
+        if x < 0:
+            return self.error(self.negative_square_root)
+
+        return math.isqrt(x)
+
+
+    def math_pow(self, base: int, exp: int) -> int:
+        return to_word(pow(base, exp, 0x10000)) if exp > 0 else 1
+
+
+    # Array
+
+    def array_new(self, size: int) -> int:
+        if size <= 0:
+            return self.error(self.array_size_not_positive)
+
+        return self.vm.invoke("Memory.alloc", [size])
+
+
+    def array_dispose(self, this: int) -> None:
+        self.vm.invoke("Memory.deAlloc", [this])
+
+
+    # String: [maxLength, length, characters...]
+
+    def string_new(self, max_length: int) -> int:
+        if max_length < 0:
+            return self.error(self.string_length_negative)
+
+        this = self.vm.invoke("Memory.alloc", [max_length + 2])
+        self.ram[this] = max_length
+        self.ram[this + 1] = 0
+        return this
+
+
+    def string_length(self, this: int) -> int:
+        return self.ram[this + 1]
+
+
+    def string_char_at(self, this: int, j: int) -> int:
+        if not 0 <= j < self.ram[this + 1]:
+            return self.error(self.string_index_out_of_bounds)
+
+        return self.ram[this + 2 + j]
+
+
+    def string_set_char_at(self, this: int, j: int, c: int) -> None:
+        if not 0 <= j < self.ram[this + 1]:
+            return self.error(self.string_index_out_of_bounds)
+
+        self.ram[this + 2 + j] = c
+
+
+    def string_append_char(self, this: int, c: int) -> int:
+        length = self.ram[this + 1]
+        if length >= self.ram[this]:
+            return self.error(self.string_full)
+
+        self.ram[this + 2 + length] = c
+        self.ram[this + 1] = length + 1
+        return this
+
+
+    def string_erase_last_char(self, this: int) -> None:
+        if self.ram[this + 1] == 0:
+            return self.error(self.string_empty)
+
+        self.ram[this + 1] -= 1
+
+
+    def string_int_value(self, this: int) -> int:
+        text = "".join(map(chr, self.ram[this + 2:this + 2 + self.ram[this + 1]]))
+        sign = -1 if text.startswith("-") else 1
+        digits = text[1:] if sign < 0 else text
+
+        value = 0
+        for c in digits:
+            if not "0" <= c <= "9":
+                break
+            value = value * 10 + ord(c) - 48
+
+        return to_word(sign * value)
+
+
+    def string_set_int(self, this: int, value: int) -> None:
+        text = str(value)
+        if len(text) > self.ram[this]:
+            return self.error(self.string_too_short_for_int)
+
+        self.ram[this + 2:this + 2 + len(text)] = map(ord, text)
+        self.ram[this + 1] = len(text)
+
+
+    def to_text(self, string: int) -> str:
+        invoke = self.vm.invoke
+        return "".join(self.character(invoke("String.charAt", [string, i])) for i in range(invoke("String.length", [string])))
+
+
+    def from_text(self, text: str) -> int:
+        invoke = self.vm.invoke
+        string = invoke("String.new", [len(text)])
+        for c in text:
+            invoke("String.appendChar", [string, ord(c)])
+
+        return string
+
+
+    # Output
+
+    def character(self, c: int) -> str:
+        return { 128: "\n", 129: "\b" }.get(c, chr(c))
+
+
+    def write(self, text: str) -> None:
+        if text:
+            self.output.write(text)
+            self.at_line_start = text.endswith("\n")
+
+
+    def end_line(self) -> None:
+        if not self.at_line_start:
+            self.write("\n")
+
+
+    def output_print_char(self, c: int) -> None:
+        self.write(self.character(c))
+
+
+    def output_print_string(self, string: int) -> None:
+        self.write(self.to_text(string))
+
+
+    def output_print_int(self, i: int) -> None:
+        self.write(str(i))
+
+
+    def output_println(self) -> None:
+        self.write("\n")
+
+
+    def output_back_space(self) -> None:
+        self.write("\b")
+
+
+    # Screen: the leftmost pixel of each 16-pixel word is its least significant bit
+
+    def screen_clear(self) -> None:
+        self.ram[self.screen:self.keyboard] = [0] * (self.keyboard - self.screen)
+
+
+    def screen_set_color(self, black: int) -> None:
+        self.black = black != 0
+
+
+    def screen_draw_pixel(self, x: int, y: int) -> None:
+        address = self.screen + y * 32 + x // 16
+        bit = 1 << (x & 15)
+        word = self.ram[address] | bit if self.black else self.ram[address] & ~bit
+        self.ram[address] = to_word(word)
+
+
+    def screen_draw_line(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        dx, dy = abs(x2 - x1), -abs(y2 - y1)
+        step_x, step_y = (1 if x1 < x2 else -1), (1 if y1 < y2 else -1)
+        error = dx + dy
+
+        while True:
+            self.screen_draw_pixel(x1, y1)
+            if x1 == x2 and y1 == y2:
+                return
+
+            error2 = 2 * error
+            if error2 >= dy:
+                error += dy
+                x1 += step_x
+            if error2 <= dx:
+                error += dx
+                y1 += step_y
+
+
+    def screen_draw_rectangle(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                self.screen_draw_pixel(x, y)
+
+
+    def screen_draw_circle(self, cx: int, cy: int, r: int) -> None:
+        for dy in range(-r, r + 1):
+            half = math.isqrt(r * r - dy * dy)
+            self.screen_draw_rectangle(cx - half, cy + dy, cx + half, cy + dy)
+
+
+    # Keyboard
+
+    def keyboard_key_pressed(self) -> int:
+        return self.ram[self.keyboard]
+
+
+    def keyboard_read_char(self) -> int:
+        c = self.input.read(1)
+        return 128 if c in ("", "\n") else ord(c)
+
+
+    def keyboard_read_line(self, message: int) -> int:
+        self.output_print_string(message)
+        self.output.flush()
+        line = self.input.readline().rstrip("\n")
+        self.at_line_start = True
+        return self.from_text(line)
+
+
+    def keyboard_read_int(self, message: int) -> int:
+        return self.vm.invoke("String.intValue", [self.keyboard_read_line(message)])
@@ -0,0 +1,228 @@
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from Assembler import Assembler
+from CPUEmulator import CPUEmulator
+from SourceMap import SourceMap, location
+
+# shared routines that behave like functions; $$CALL and $$RETURN are part of the call sequence itself
+routine_entries = { "$$EQ", "$$GT", "$$LT", "$$MULTIPLY", "$$DIVIDE" }
+
+Stack = Tuple[str, ...]
+
+
+class Profiler:
+    """
+    Runs a translated program one instruction at a time and attributes every instruction to the stack of
+    functions executing it. Following Translate's labels, a jump to a function's label (or to a shared
+    routine) is a call and a jump to a return address label ("caller$ret.N", "File$RET_...") is a return.
+    """
+
+    def __init__(self, rom: List[int], symbols: Dict[str, int]):
+        self.rom = rom
+        self.symbols = symbols
+        self.ram = [0] * CPUEmulator.ram_size
+        self.pc = 0
+        self.a = 0
+        self.d = 0
+        self.cycles = 0
+
+        self.entries: Dict[int, str] = {}
+        self.return_addresses = set()
+        for name, address in symbols.items():
+            # static variables are named "File.N" too, but with a number
+            if ("." in name and "$" not in name and not name.rpartition(".")[2].isdigit()) or name in routine_entries:
+                self.entries[address] = name
+            elif "$ret" in name or "$RET_" in name:
+                self.return_addresses.add(address)
+
+        # instructions executed with each stack on top, and calls to each function
+        self.stack: Stack = ("Bootstrap",)
+        self.stack_cycles: Counter = Counter()
+        self.calls: Counter = Counter()
+        # instructions executed at each ROM address, for attributing cycles to source lines
+        self.address_cycles = [0] * len(rom)
+
+        self.comp_by_bits = CPUEmulator.decode_comp_table()
+        self.decoded = [self.decode(word) for word in rom]
+
+
+    @classmethod
+    def from_file(cls, filename: str) -> "Profiler":
+        assembler = Assembler.from_file(filename)
+        return cls(assembler.assemble(), assembler.symbols)
+
+
+    def decode(self, word: int) -> Optional[Tuple]:
+        if word < 0x8000:
+            return None
+
+        comp_bits = (word >> 6) & 0x7F
+        if comp_bits not in self.comp_by_bits:
+            return (None, False, 0, None)
+
+        expression, uses_m = self.comp_by_bits[comp_bits]
+        comp = eval(f'lambda D, y: {expression}')
+        jump = word & 0x7
+        condition = eval(f'lambda v: {CPUEmulator.jump_conditions[jump]}') if jump else None
+        return (comp, uses_m, (word >> 3) & 0x7, condition)
+
+
+    def run(self, max_cycles: int, stop_at: Optional[int] = None) -> int:
+        """Runs like CPUEmulator.run: until max_cycles more instructions, a halt loop, or the address stop_at."""
+        rom, decoded, R = self.rom, self.decoded, self.ram
+        entries, return_addresses = self.entries, self.return_addresses
+        stack, stack_cycles, calls, address_cycles = self.stack, self.stack_cycles, self.calls, self.address_cycles
+        pc, A, D = self.pc, self.a, self.d
+        cycles = flushed = self.cycles
+        limit = cycles + max_cycles
+
+        try:
+            while cycles < limit and pc != stop_at and pc < len(rom):
+                instruction = decoded[pc]
+                address_cycles[pc] += 1
+                cycles += 1
+
+                if instruction is None:
+                    A = rom[pc]
+                    pc += 1
+                    continue
+
+                comp, uses_m, dest, condition = instruction
+                if comp is None:
+                    raise ValueError(f'invalid instruction {rom[pc]:016b} at address {pc}')
+
+                v = comp(D, R[A] if uses_m else A)
+                target = A
+                if dest & 1:
+                    R[A] = v
+                if dest & 2:
+                    D = v
+                if dest & 4:
+                    A = v
+
+                if condition is None or not condition(v):
+                    pc += 1
+                    continue
+
+                # "@X, 0;JMP" at X is how Hack programs stop
+                if target == pc - 1 and rom[target] == target:
+                    address_cycles[pc] -= 1
+                    cycles -= 1
+                    break
+
+                if target in entries:
+                    stack_cycles[stack] += cycles - flushed
+                    flushed = cycles
+                    stack = stack + (entries[target],)
+                    calls[entries[target]] += 1
+                elif target in return_addresses and len(stack) > 1:
+                    stack_cycles[stack] += cycles - flushed
+                    flushed = cycles
+                    stack = stack[:-1]
+                pc = target
+        except IndexError:
+            raise RuntimeError(f'memory access out of range at ROM address {pc} in {stack[-1]}') from None
+
+        stack_cycles[stack] += cycles - flushed
+        executed = cycles - self.cycles
+        self.pc, self.a, self.d, self.cycles, self.stack = pc, A, D, cycles, stack
+        return executed
+
+
+    def exclusive_cycles(self) -> Counter:
+        totals = Counter()
+        for stack, cycles in self.stack_cycles.items():
+            totals[stack[-1]] += cycles
+
+        return totals
+
+
+    def inclusive_cycles(self) -> Counter:
+        totals = Counter()
+        for stack, cycles in self.stack_cycles.items():
+            # a recursive function is counted once per stack
+            for name in set(stack):
+                totals[name] += cycles
+
+        return totals
+
+
+    def write_flat_profile(self, file=sys.stdout, limit: int = 30) -> None:
+        exclusive, inclusive = self.exclusive_cycles(), self.inclusive_cycles()
+        total = max(self.cycles, 1)
+
+        print(f'{"self":>12} {"%":>6} {"total":>12} {"%":>6} {"calls":>9}  function', file=file)
+        for name, cycles in exclusive.most_common(limit):
+            print(f'{cycles:12} {100 * cycles / total:6.2f} {inclusive[name]:12} {100 * inclusive[name] / total:6.2f} '
+                  f'{self.calls[name]:9}  {name}', file=file)
+
+
+    def line_cycles(self, source_map: SourceMap) -> Counter:
+        """Instructions executed for each Jack line (or .vm file, for code without lines) of the source map."""
+        totals = Counter()
+        for source, line, vm_file, _, start, end in source_map.mappings:
+            cycles = sum(self.address_cycles[start:end])
+            if cycles:
+                totals[(source or vm_file, line)] += cycles
+
+        # the bootstrap and the shared routines the translator appends do not come from any VM command
+        unmapped = sum(self.address_cycles) - sum(totals.values())
+        if unmapped:
+            totals[("(bootstrap and shared routines)", 0)] = unmapped
+
+        return totals
+
+
+    def write_line_profile(self, source_map: SourceMap, file=sys.stdout, limit: int = 30) -> None:
+        total = max(self.cycles, 1)
+
+        print(f'{"cycles":>12} {"%":>6}  line', file=file)
+        for key, cycles in self.line_cycles(source_map).most_common(limit):
+            print(f'{cycles:12} {100 * cycles / total:6.2f}  {location(key)}', file=file)
+
+
+    def write_collapsed_stacks(self, output_filename: str) -> None:
+        """One "frame;frame;frame count" line per stack, the input format of flamegraph.pl and speedscope."""
+        with open(output_filename, "w") as file:
+            file.write("".join(f'{";".join(stack)} {cycles}\n' for stack, cycles in sorted(self.stack_cycles.items()) if cycles))
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python Profiler.py [filename.asm] [--cycles N] [--key CODE] [--collapsed out.folded] [--source-map file.map]")
+    parser.add_argument("path")
+    parser.add_argument("--cycles", type=int, default=10_000_000, help="maximum number of instructions to run")
+    parser.add_argument("--key", type=int, default=0, help="hold down this key (its Hack character code) for the whole run")
+    parser.add_argument("--collapsed", help="write the collapsed stacks, for flame graphs, to this file")
+    parser.add_argument("--source-map", help="also list the hottest Jack lines, using the map written by VMTranslator.py --source-map")
+    parser.add_argument("--top", type=int, default=30, help="number of functions in the flat profile")
+    args = parser.parse_args()
+
+    if not args.path.endswith(".asm") or not Path(args.path).is_file():
+        print(f"Error: File '{args.path}' not found or not an .asm file (the profiler needs its labels).")
+        sys.exit(1)
+
+    profiler = Profiler.from_file(args.path)
+    profiler.ram[CPUEmulator.keyboard] = args.key
+
+    start = time.perf_counter()
+    cycles = profiler.run(args.cycles, profiler.symbols.get("Sys.halt"))
+    elapsed = time.perf_counter() - start
+
+    print(f'{cycles} cycles profiled in {elapsed:.2f} s')
+    profiler.write_flat_profile(limit=args.top)
+
+    if args.source_map:
+        print()
+        profiler.write_line_profile(SourceMap(args.source_map), limit=args.top)
+
+    if args.collapsed:
+        profiler.write_collapsed_stacks(args.collapsed)
+
+
+if __name__ == "__main__":
+    main()
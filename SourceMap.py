@@ -0,0 +1,82 @@
+import argparse
+import json
+import sys
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# (Jack file or None, Jack line or 0, .vm file, VM command index, first ROM address, end ROM address)
+Mapping = Tuple[Optional[str], int, str, int, int, int]
+
+
+class SourceMap:
+    """
+    Reads the <output>.map written by "VMTranslator.py --source-map", which maps every VM command of a
+    program to its ROM address range and, for files compiled with "JackCompiler.py --source-map", to
+    the Jack line it came from.
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, "r") as file:
+            self.files = json.load(file)["files"]
+
+        # ROM ranges that generated code, sorted by address, for lookup()
+        self.mappings: List[Mapping] = [mapping for mapping in self.expand() if mapping[5] > mapping[4]]
+        self.starts = [mapping[4] for mapping in self.mappings]
+
+
+    def expand(self) -> Iterator[Mapping]:
+        for mapped_file in self.files:
+            source = mapped_file.get("source")
+            runs = mapped_file.get("lines", [])
+            lines = [line for i in range(0, len(runs), 2) for line in [runs[i]] * runs[i+1]]
+
+            address = mapped_file["start"]
+            for index, words in enumerate(mapped_file["words"]):
+                yield (source, lines[index] if lines else 0, mapped_file["vm"], index, address, address + words)
+                address += words
+
+
+    def lookup(self, address: int) -> Optional[Mapping]:
+        i = bisect_right(self.starts, address) - 1
+        if i >= 0 and address < self.mappings[i][5]:
+            return self.mappings[i]
+
+        return None
+
+
+    def words_by_line(self) -> Counter:
+        """ROM words generated by each (Jack file, line), or (.vm file, 0) for code without Jack lines."""
+        words = Counter()
+        for source, line, vm_file, _, start, end in self.mappings:
+            words[(source or vm_file, line)] += end - start
+
+        return words
+
+
+def location(key: Tuple[str, int]) -> str:
+    source, line = key
+    return f'{source}:{line}' if line else source
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python SourceMap.py [filename.map] [--top N]")
+    parser.add_argument("path")
+    parser.add_argument("--top", type=int, default=30, help="number of lines to list")
+    args = parser.parse_args()
+
+    if not Path(args.path).is_file():
+        print(f"Error: File '{args.path}' not found.")
+        sys.exit(1)
+
+    words = SourceMap(args.path).words_by_line()
+    total = sum(words.values())
+
+    print(f'{"ROM words":>10} {"%":>6}  line')
+    for key, count in words.most_common(args.top):
+        print(f'{count:10} {100 * count / total:6.2f}  {location(key)}')
+
+
+if __name__ == "__main__":
+    main()
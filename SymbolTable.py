@@ -1,17 +1,22 @@
+from collections import namedtuple
+
+Symbol = namedtuple("Symbol", ["name", "type", "kind", "index"])
+
 class SymbolTable:
 
     class_var_kinds = ["field", "static"]
     subroutine_var_kinds = ["argument", "local"]
 
     def __init__(self):
-        self.class_symbols = { kind: [] for kind in self.class_var_kinds }
+        # each scope maps name -> Symbol, and keeps a running count per kind to hand out indexes
+        self.class_symbols = {}
+        self.class_counts = { kind: 0 for kind in self.class_var_kinds }
         self.clear_subroutine_symbols()
-        self.tables = [self.subroutine_symbols, self.class_symbols]
 
     
     def clear_subroutine_symbols(self) -> None:
-        self.subroutine_symbols = { kind: [] for kind in self.subroutine_var_kinds }
-        self.tables = [self.subroutine_symbols, self.class_symbols]
+        self.subroutine_symbols = {}
+        self.subroutine_counts = { kind: 0 for kind in self.subroutine_var_kinds }
     
     
     def add_symbol(self, symbol_details) -> None:
@@ -19,24 +24,28 @@ class SymbolTable:
         if var_kind == "var":
             var_kind = "local"
 
-        symbol_table = self.class_symbols if var_kind in self.class_var_kinds else self.subroutine_symbols
-        kind_count = len(symbol_table[var_kind])
+        if var_kind in self.class_var_kinds:
+            symbol_table, counts = self.class_symbols, self.class_counts
+        else:
+            symbol_table, counts = self.subroutine_symbols, self.subroutine_counts
 
-        symbol_table[var_kind].append((var_name, var_type, var_kind, kind_count))
+        symbol_table[var_name] = Symbol(var_name, var_type, var_kind, counts[var_kind])
+        counts[var_kind] += 1
     
 
     def find_symbol(self, name) -> tuple:
-        for table in self.tables:
-            for symbols in table.values():
-                for symbol in symbols:
-                    if symbol[0] == name:
-                        return symbol
+        symbol = self.subroutine_symbols.get(name)
+        if symbol is None:
+            symbol = self.class_symbols.get(name, ())
 
-        return ()
+        return symbol
 
 
     def get_local_vars_count(self) -> int:
-        return len(self.subroutine_symbols["local"])
+        return self.subroutine_counts["local"]
 
     def get_fields_count(self) -> int:
-        return len(self.class_symbols["field"])
+        return self.class_counts["field"]
+
+    def get_statics_count(self) -> int:
+        return self.class_counts["static"]
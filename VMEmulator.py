@@ -0,0 +1,363 @@
+import argparse
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from CPUEmulator import write_screen
+from NativeOS import NativeOS
+from VMTranslator import Translate
+
+# a function defined in a .vm file: its precompiled ops and a zero for each of its local variables
+Function = namedtuple("Function", ["name", "code", "locals"])
+
+# an op is (kind, arg): PLAIN ops are closures that run one stack or memory command, the others transfer
+# control and are handled by execute itself. CALL and NATIVE args are (function, nArgs, name).
+PLAIN, GOTO, IF_GOTO, CALL, NATIVE, RETURN = range(6)
+
+# indexes of the frame registers, which hold stack positions (ARG, LCL) and RAM addresses (THIS, THAT)
+ARG, LCL, THIS, THAT = range(4)
+
+
+class Halt(Exception):
+    pass
+
+
+class StepLimitReached(Exception):
+    pass
+
+
+class VMEmulator:
+    """
+    Runs .vm files directly. The operand stack is a Python list that also holds each frame's arguments and local
+    variables, while objects, arrays, the screen and the keyboard live in a RAM list, as on the Hack computer.
+    Functions the .vm files do not define are taken from NativeOS.
+    """
+
+    ram_size = 32768
+    screen = 16384
+    screen_words = 8192
+
+    def __init__(self, output=None, input=None):
+        self.ram = [0] * self.ram_size
+        self.stack: List[int] = []
+        self.registers = [0, 0, 0, 0]
+        self.temp = [0] * 8
+        self.statics: Dict[str, List[int]] = {}
+        # return points: (code, pc, ARG, LCL, THIS, THAT), with code None where a call from Python returns
+        self.frames = []
+
+        self.functions: Dict[str, Function] = {}
+        self.os = NativeOS(self, output or sys.stdout, input or sys.stdin)
+        self.natives: Dict[str, Callable] = self.os.functions()
+        self.linked = False
+
+        self.executed = 0
+        self.limit = 0
+
+
+    def load(self, input_file: str) -> None:
+        ref = input_file.rsplit("/", 1)[-1][:-3]
+        commands = Translate.read_commands(input_file)
+
+        static_count = max((command[2] + 1 for command in commands if command[1:2] == ["static"]), default=0)
+        statics = self.statics.setdefault(ref, [])
+        statics.extend([0] * (static_count - len(statics)))
+
+        starts = [i for i, command in enumerate(commands) if command[0] == "function"]
+        for start, end in zip(starts, starts[1:] + [len(commands)]):
+            _, name, n_locals = commands[start]
+            self.functions[name] = Function(name, self.compile_function(commands[start+1:end], statics), (0,) * int(n_locals))
+
+        self.linked = False
+
+
+    def compile_function(self, commands: List[List], statics: List[int]) -> List:
+        # labels are local to their function and resolve to the index of the op that follows them
+        labels = {}
+        position = 0
+        for command in commands:
+            if command[0] == "label":
+                labels[command[1]] = position
+            else:
+                position += 1
+
+        code = []
+        for command in commands:
+            cmd = command[0]
+            if cmd == "label":
+                continue
+
+            if cmd in ("goto", "if-goto"):
+                if command[1] not in labels:
+                    print(f"Error: label '{command[1]}' is not defined.")
+                    sys.exit(1)
+                code.append((GOTO if cmd == "goto" else IF_GOTO, labels[command[1]]))
+            elif cmd == "call":
+                # bound to the function or native once every file is loaded
+                code.append((CALL, (None, int(command[2]), command[1])))
+            elif cmd == "return":
+                code.append((RETURN, None))
+            elif cmd == "push":
+                code.append((PLAIN, self.compile_push(command[1], command[2], statics)))
+            elif cmd == "pop":
+                code.append((PLAIN, self.compile_pop(command[1], command[2], statics)))
+            else:
+                code.append((PLAIN, self.compile_arithmetic(cmd)))
+
+        return code
+
+
+    def compile_push(self, segment: str, index: int, statics: List[int]) -> Callable:
+        stack, r, ram, temp = self.stack, self.registers, self.ram, self.temp
+        append = stack.append
+
+        if segment == "constant":
+            return lambda: append(index)
+        if segment == "local":
+            return lambda: append(stack[r[LCL] + index])
+        if segment == "argument":
+            return lambda: append(stack[r[ARG] + index])
+        if segment == "this":
+            return lambda: append(ram[r[THIS] + index])
+        if segment == "that":
+            return lambda: append(ram[r[THAT] + index])
+        if segment == "pointer":
+            register = THIS + index
+            return lambda: append(r[register])
+        if segment == "temp":
+            return lambda: append(temp[index])
+
+        return lambda: append(statics[index])
+
+
+    def compile_pop(self, segment: str, index: int, statics: List[int]) -> Callable:
+        stack, r, ram, temp = self.stack, self.registers, self.ram, self.temp
+        pop = stack.pop
+
+        def pop_local():
+            stack[r[LCL] + index] = pop()
+        def pop_argument():
+            stack[r[ARG] + index] = pop()
+        def pop_this():
+            ram[r[THIS] + index] = pop()
+        def pop_that():
+            ram[r[THAT] + index] = pop()
+        def pop_pointer():
+            r[THIS + index] = pop()
+        def pop_temp():
+            temp[index] = pop()
+        def pop_static():
+            statics[index] = pop()
+
+        ops = {
+            "local": pop_local, "argument": pop_argument, "this": pop_this, "that": pop_that,
+            "pointer": pop_pointer, "temp": pop_temp, "static": pop_static,
+        }
+        if segment not in ops:
+            print(f"Error: cannot pop to the '{segment}' segment.")
+            sys.exit(1)
+
+        return ops[segment]
+
+
+    def compile_arithmetic(self, cmd: str) -> Callable:
+        stack = self.stack
+        pop = stack.pop
+
+        def add():
+            y = pop()
+            stack[-1] = ((stack[-1] + y + 0x8000) & 0xFFFF) - 0x8000
+        def sub():
+            y = pop()
+            stack[-1] = ((stack[-1] - y + 0x8000) & 0xFFFF) - 0x8000
+        def neg():
+            stack[-1] = ((0x8000 - stack[-1]) & 0xFFFF) - 0x8000
+        def eq():
+            y = pop()
+            stack[-1] = -(stack[-1] == y)
+        # the translated code compares by subtracting, so these overflow exactly as it does
+        def gt():
+            y = pop()
+            stack[-1] = -(0 < ((stack[-1] - y + 0x8000) & 0xFFFF) - 0x8000)
+        def lt():
+            y = pop()
+            stack[-1] = -(((stack[-1] - y + 0x8000) & 0xFFFF) - 0x8000 < 0)
+        def and_():
+            y = pop()
+            stack[-1] &= y
+        def or_():
+            y = pop()
+            stack[-1] |= y
+        def not_():
+            stack[-1] = ~stack[-1]
+
+        return {
+            "add": add, "sub": sub, "neg": neg, "eq": eq, "gt": gt, "lt": lt, "and": and_, "or": or_, "not": not_,
+        }[cmd]
+
+
+    def link(self) -> None:
+        """Binds every call to a function of the loaded files, or to NativeOS for the ones they do not define."""
+        for function in self.functions.values():
+            code = function.code
+            for i, (kind, arg) in enumerate(code):
+                if kind not in (CALL, NATIVE):
+                    continue
+
+                _, n_args, name = arg
+                # Sys.halt always stops the run, even when the loaded OS implements it as an endless loop
+                if name in self.functions and name != "Sys.halt":
+                    code[i] = (CALL, (self.functions[name], n_args, name))
+                else:
+                    code[i] = (NATIVE, (self.native(name), n_args, name))
+
+        self.linked = True
+
+
+    def native(self, name: str) -> Callable:
+        if name in self.natives:
+            return self.natives[name]
+
+        def undefined(*args):
+            raise RuntimeError(f'function {name} is not defined')
+
+        return undefined
+
+
+    def invoke(self, name: str, args: List[int]) -> int:
+        """Calls a loaded or native function from Python and returns its result."""
+        if name in self.functions and name != "Sys.halt":
+            return self.execute(self.functions[name], args)
+
+        return self.native(name)(*args) or 0
+
+
+    def halt(self) -> None:
+        raise Halt()
+
+
+    def execute(self, function: Function, args: List[int]) -> int:
+        stack, r, frames = self.stack, self.registers, self.frames
+        append, pop = stack.append, stack.pop
+        limit = self.limit
+        executed = self.executed
+
+        frames.append((None, 0, r[ARG], r[LCL], r[THIS], r[THAT]))
+        stack.extend(args)
+        r[ARG] = len(stack) - len(args)
+        r[LCL] = len(stack)
+        stack.extend(function.locals)
+        code = function.code
+        pc = start = 0
+
+        try:
+            while True:
+                kind, arg = code[pc]
+                pc += 1
+                if not kind:
+                    arg()
+                    continue
+
+                # instructions are counted a run at a time, whenever control may leave the straight-line code
+                executed += pc - start
+
+                if kind == IF_GOTO:
+                    if pop():
+                        pc = arg
+                elif kind == GOTO:
+                    pc = arg
+                elif kind == CALL:
+                    callee, n_args, _ = arg
+                    frames.append((code, pc, r[ARG], r[LCL], r[THIS], r[THAT]))
+                    r[LCL] = len(stack)
+                    r[ARG] = r[LCL] - n_args
+                    stack.extend(callee.locals)
+                    code = callee.code
+                    pc = 0
+                elif kind == NATIVE:
+                    native, n_args, _ = arg
+                    args = stack[len(stack) - n_args:]
+                    del stack[len(stack) - n_args:]
+                    self.executed = executed
+                    append(native(*args) or 0)
+                    executed = self.executed
+                else:
+                    value = pop()
+                    del stack[r[ARG]:]
+                    code, pc, r[ARG], r[LCL], r[THIS], r[THAT] = frames.pop()
+                    if code is None:
+                        self.executed = executed
+                        return value
+                    append(value)
+
+                if executed >= limit:
+                    self.executed = executed
+                    raise StepLimitReached()
+                start = pc
+        except IndexError:
+            self.executed = executed
+            raise RuntimeError(f'stack underflow or memory access out of range in {self.function_at(code)}') from None
+
+
+    def function_at(self, code: List) -> str:
+        return next((function.name for function in self.functions.values() if function.code is code), "?")
+
+
+    def run(self, max_steps: int) -> bool:
+        """
+        Runs Sys.init (from the loaded files or NativeOS) until Sys.halt or max_steps more VM instructions.
+        Returns whether the program halted.
+        """
+        if not self.linked:
+            self.link()
+
+        self.limit = self.executed + max_steps
+        self.frames.clear()
+        del self.stack[:]
+        try:
+            self.invoke("Sys.init", [])
+        except Halt:
+            return True
+        except StepLimitReached:
+            return False
+
+        return True
+
+
+    def dump_screen(self, output_filename: str) -> None:
+        write_screen(self.ram[self.screen:self.screen + self.screen_words], output_filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python VMEmulator.py [filename.vm|directory] [--steps N] [--screen out.pbm]")
+    parser.add_argument("path")
+    parser.add_argument("--steps", type=int, default=10_000_000, help="maximum number of VM instructions to run")
+    parser.add_argument("--screen", help="write the screen to this .pbm file when the run ends")
+    args = parser.parse_args()
+
+    emulator = VMEmulator()
+    if args.path.endswith(".vm") and Path(args.path).is_file():
+        emulator.load(args.path)
+    elif Path(args.path).is_dir():
+        for file in sorted(Path(args.path).glob("*.vm")):
+            emulator.load(str(file))
+    else:
+        print(f"Error: Input must be a either a filename with .vm extension or a directory")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    halted = emulator.run(args.steps)
+    elapsed = time.perf_counter() - start
+
+    emulator.os.end_line()
+    status = "halted" if halted else "stopped"
+    print(f'{status} after {emulator.executed} VM instructions in {elapsed:.2f} s ({emulator.executed / elapsed / 1e6:.2f} M instructions/s)')
+
+    if args.screen:
+        emulator.dump_screen(args.screen)
+
+
+if __name__ == "__main__":
+    main()
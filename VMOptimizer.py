@@ -0,0 +1,256 @@
+"""
+Peephole optimizer for the VM code emitted by VMWriter.
+
+The rules assume code produced by CompilationEngine: labels are unique within a function and temp 0 is
+only ever used as a scratch register (written immediately before it is read).
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+unary_ops: Dict[str, Callable[[int], int]] = {
+    "neg": lambda x: -x,
+    "not": lambda x: ~x,
+}
+
+binary_ops: Dict[str, Callable[[int, int], int]] = {
+    "add": lambda x, y: x + y,
+    "sub": lambda x, y: x - y,
+    "and": lambda x, y: x & y,
+    "or": lambda x, y: x | y,
+    "eq": lambda x, y: -1 if x == y else 0,
+    "gt": lambda x, y: -1 if x > y else 0,
+    "lt": lambda x, y: -1 if x < y else 0,
+}
+
+# segments whose value can be pushed after "pop pointer 1" in place of before it
+independent_segments = { "constant", "local", "argument", "static", "this" }
+
+Rewrite = Optional[Tuple[int, List[str]]]
+
+
+def to_word(value: int) -> int:
+    """Wraps a Python int to a signed 16-bit Hack word."""
+    return (value + 0x8000) % 0x10000 - 0x8000
+
+
+def push_constant(value: int) -> List[str]:
+    if value >= 0:
+        return [f'push constant {value}']
+    if value == -0x8000:
+        return ["push constant 32767", "not"]
+
+    return [f'push constant {-value}', "neg"]
+
+
+def fold_binary(cmd: str, x: int, y: int) -> Optional[int]:
+    """Evaluates a binary VM command on two constants, or returns None if it should be left to run time."""
+    # the translator compares by subtracting, so only fold comparisons that cannot overflow
+    if cmd in ("gt", "lt") and to_word(x - y) != x - y:
+        return None
+
+    return to_word(binary_ops[cmd](x, y))
+
+
+def constant_at(code: List[str], i: int) -> Optional[Tuple[int, int]]:
+    """Returns (value, length) if the code at i pushes a constant, e.g. "push constant 1" + "neg"."""
+    if i >= len(code) or not code[i].startswith("push constant "):
+        return None
+
+    value = int(code[i].split()[2])
+    if i + 1 < len(code) and code[i+1] in unary_ops and unary_ops[code[i+1]](value) < 0:
+        return (to_word(unary_ops[code[i+1]](value)), 2)
+
+    return (value, 1)
+
+
+def fold_constants(code: List[str], i: int) -> Rewrite:
+    constant = constant_at(code, i)
+    if not constant:
+        return None
+
+    x, x_length = constant
+    j = i + x_length
+
+    if j < len(code) and code[j] in unary_ops:
+        folded = push_constant(to_word(unary_ops[code[j]](x)))
+        return (x_length + 1, folded) if len(folded) < x_length + 1 else None
+
+    constant = constant_at(code, j)
+    if not constant:
+        return None
+
+    y, y_length = constant
+    k = j + y_length
+    if k >= len(code) or code[k] not in binary_ops:
+        return None
+
+    value = fold_binary(code[k], x, y)
+    if value is None:
+        return None
+
+    return (x_length + y_length + 1, push_constant(value))
+
+
+def remove_double_negation(code: List[str], i: int) -> Rewrite:
+    if i + 1 < len(code) and code[i] in unary_ops and code[i] == code[i+1]:
+        return (2, [])
+
+    return None
+
+
+def remove_push_pop_pair(code: List[str], i: int) -> Rewrite:
+    if i + 1 < len(code) and code[i].startswith("push ") and not code[i].startswith("push constant "):
+        if code[i+1] == "pop " + code[i][5:]:
+            return (2, [])
+
+    return None
+
+
+def fold_constant_branch(code: List[str], i: int) -> Rewrite:
+    constant = constant_at(code, i)
+    if not constant:
+        return None
+
+    value, length = constant
+    if i + length < len(code) and code[i+length].startswith("if-goto "):
+        label = code[i+length].split()[1]
+        return (length + 1, [f'goto {label}'] if value else [])
+
+    return None
+
+
+def remove_jump_to_next(code: List[str], i: int) -> Rewrite:
+    if i + 1 < len(code) and code[i].startswith("goto ") and code[i+1] == "label " + code[i][5:]:
+        return (1, [])
+
+    return None
+
+
+def remove_unreachable(code: List[str], i: int) -> Rewrite:
+    # nothing after an unconditional jump runs until the next label or function
+    if i + 1 < len(code) and (code[i] == "return" or code[i].startswith("goto ")):
+        if not code[i+1].startswith(("label ", "function ")):
+            return (2, [code[i]])
+
+    return None
+
+
+def simplify_array_store(code: List[str], i: int) -> Rewrite:
+    # push <value>, pop temp 0, pop pointer 1, push temp 0, pop that 0  =>  pop pointer 1, push <value>, pop that 0
+    if code[i:i+5] != [code[i], "pop temp 0", "pop pointer 1", "push temp 0", "pop that 0"]:
+        return None
+
+    components = code[i].split()
+    if components[0] == "push" and components[1] in independent_segments:
+        return (5, ["pop pointer 1", code[i], "pop that 0"])
+
+    return None
+
+
+peephole_rules = [
+    fold_constants,
+    remove_double_negation,
+    remove_push_pop_pair,
+    fold_constant_branch,
+    remove_jump_to_next,
+    remove_unreachable,
+    simplify_array_store,
+]
+
+
+def function_end(code: List[str], i: int) -> int:
+    j = i
+    while j < len(code) and not code[j].startswith("function "):
+        j += 1
+
+    return j
+
+
+def yields_boolean(code: List[str], i: int) -> bool:
+    """Whether the code ending at i leaves exactly 0 (false) or -1 (true) on the stack."""
+    if i < 0:
+        return False
+    if code[i] in ("eq", "gt", "lt") or code[i] == "push constant 0":
+        return True
+    if code[i] == "neg":
+        return i > 0 and code[i-1] == "push constant 1"
+    if code[i] == "not":
+        return yields_boolean(code, i - 1)
+
+    return False
+
+
+def swap_if_else(code: List[str], lines: List[int]) -> bool:
+    """
+    Fuses the "not" + "if-goto" of an if statement by swapping its branches:
+
+        not, if-goto ELSE, <then>, goto END, label ELSE, <else>, label END
+    =>  if-goto ELSE, <else>, goto END, label ELSE, <then>, label END
+
+    lines (the source line of each instruction) is rearranged the same way. "not" is bitwise, so this is only
+    done when the condition is 0 or -1: the "not" of any other nonzero value is still true.
+    """
+    changed = False
+    i = 0
+
+    while i + 1 < len(code):
+        if code[i] != "not" or not code[i+1].startswith("if-goto ") or not yields_boolean(code, i - 1):
+            i += 1
+            continue
+
+        else_label = code[i+1].split()[1]
+        end = function_end(code, i)
+        body = code[i+2:end]
+
+        references = sum(1 for line in code[:end] if line.split()[-1] == else_label and line.startswith(("goto ", "if-goto ")))
+        else_idx = body.index(f'label {else_label}') if f'label {else_label}' in body else -1
+
+        if references != 1 or else_idx < 1 or not body[else_idx-1].startswith("goto "):
+            i += 1
+            continue
+
+        end_label = body[else_idx-1].split()[1]
+        if f'label {end_label}' not in body[else_idx+1:]:
+            i += 1
+            continue
+
+        end_idx = body.index(f'label {end_label}', else_idx + 1)
+        then_block, else_block = body[:else_idx-1], body[else_idx+1:end_idx]
+
+        code[i:i+2+end_idx] = [code[i+1]] + else_block + [f'goto {end_label}', f'label {else_label}'] + then_block
+
+        body_lines = lines[i+2:end]
+        lines[i:i+2+end_idx] = [lines[i+1]] + body_lines[else_idx+1:end_idx] + body_lines[else_idx-1:else_idx+1] + body_lines[:else_idx-1]
+        changed = True
+        i += 1
+
+    return changed
+
+
+def optimize(code: List[str]) -> List[str]:
+    return optimize_mapped(code, [0] * len(code))[0]
+
+
+def optimize_mapped(code: List[str], lines: List[int]) -> Tuple[List[str], List[int]]:
+    """Optimizes code along with the source line of each instruction. Rewritten code keeps the line of its first instruction."""
+    code, lines = list(code), list(lines)
+    changed = True
+
+    while changed:
+        changed = swap_if_else(code, lines)
+
+        i = 0
+        while i < len(code):
+            for rule in peephole_rules:
+                rewrite = rule(code, i)
+                if rewrite is not None:
+                    length, replacement = rewrite
+                    code[i:i+length] = replacement
+                    lines[i:i+length] = [lines[i]] * len(replacement)
+                    changed = True
+                    # step back so that patterns that now span the rewritten code are found too
+                    i = max(i - 3, 0)
+                    break
+            else:
+                i += 1
+
+    return code, lines
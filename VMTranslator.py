@@ -1,6 +1,22 @@
+import argparse
+import json
+import os
 import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
+
+from Assembler import Assembler
+from BuildCache import BuildCache, code_version, translator_modules
+from Emitter import Emitter
+
+# the translation of one .vm file on its own: its code and ROM words per VM command, and what the linker needs to know
+# about it (counters for the reports, and the intrinsics and comparisons whose shared routines it uses); the
+# functions of the file left out as unreachable have no code and 0 words for each of their commands, and the code of
+# the calls replaced by the bodies of the functions in inlined is mapped to their call commands
+Fragment = namedtuple("Fragment", ["source", "code", "words", "counters", "intrinsic_calls", "used_comparisons", "dropped", "inlined"])
 
 class Translate:
 
@@ -17,79 +33,911 @@ class Translate:
 
     saved_pointers = ["@LCL", "@ARG", "@THIS", "@THAT"]
 
-    R1 = "@R13"
-    R2 = "@R14"
-    R3 = "@R15"
+    # jump taken when a comparison is true, and when it is false (for a comparison followed by "not")
+    comparison_jumps = { "eq": "JEQ", "gt": "JGT", "lt": "JLT" }
+    inverted_jumps = { "eq": "JNE", "gt": "JLE", "lt": "JGE" }
 
-    op_count = 0
-    current_caller = ""
-    caller_count = {}
+    # OS functions translated without a call frame, with their number of arguments;
+    # the longer ones run in a single shared routine, the others are written inline
+    intrinsic_functions = {
+        "Math.multiply": 2, "Math.divide": 2, "Math.abs": 1, "Math.min": 2, "Math.max": 2,
+        "Memory.peek": 1, "Memory.poke": 2,
+    }
+    shared_intrinsics = { "Math.multiply": "$$MULTIPLY", "Math.divide": "$$DIVIDE" }
+    # the OS functions those routines call: $$DIVIDE reports division by zero like Math.divide does
+    intrinsic_callees = { "Math.divide": "Sys.error" }
 
+    # counters a translated file advances, added up by the linker
+    fragment_counters = ("call_sites", "return_sites", "fused_compares", "fused_negations", "shared_compares", "inlined_calls")
 
-    def __init__(self, output_filename: str = "", is_dir: bool = False):
-        # delete output file if it already exists
-        output_file = Path(output_filename)
-        if output_file.is_file():
-            output_file.unlink()
+    R1 = "@R13"
+    R2 = "@R14"
+    R3 = "@R15"
 
-        self.output_file = output_filename
 
+    def __init__(self, output_filename: str = "", is_dir: bool = False, shared_calls: bool = False, compact_compare: bool = False,
+                 intrinsics: bool = False, cache: Optional[BuildCache] = None, drop_unreachable: bool = False, inline_threshold: int = 0):
+        # label counters are per instance so that separate translations never share state; each file is
+        # translated on a fresh instance, so the labels it generates are numbered per file
+        self.ref = ""
+        self.op_count = 0
+        self.current_caller = ""
+        self.caller_count = {}
+
+        # with shared_calls, every call and return jumps to a single copy of the frame handling code
+        self.shared_calls = shared_calls
+        self.call_sites = 0
+        self.return_sites = 0
+        self.rom_words = 0
+
+        # with compact_compare, a comparison followed by if-goto becomes a single conditional jump
+        # and any other comparison jumps to a shared routine
+        self.compact_compare = compact_compare
+        self.fused_compares = 0
+        self.fused_negations = 0
+        self.shared_compares = 0
+        self.used_comparisons = set()
+
+        # with intrinsics, calls to the functions in intrinsic_functions are replaced by Hack code that builds no frame;
+        # this bypasses the program's own Math and Memory, so it is only for programs built with the bundled OS
+        self.intrinsics = intrinsics
+        self.intrinsic_calls = {}
+
+        # with drop_unreachable, translate_files leaves out the functions that no chain of calls from Sys.init reaches;
+        # dropped_functions holds the names left out of each file
+        self.drop_unreachable = drop_unreachable
+        self.dropped_functions = {}
+
+        # with an inline_threshold, translate_files replaces the calls of leaf functions of at most that many commands
+        # by their bodies; inlined_functions holds the functions inlined somewhere
+        self.inline_threshold = inline_threshold
+        self.inlined_calls = 0
+        self.inlined_functions = set()
+
+        # for source maps: the first ROM address of each translated file and the words of each of its VM commands
+        self.mapped_files = []
+
+        # with a cache, files translated before with the same content and options are not translated again
+        self.cache = cache
+
+        # without an output filename the Hack instructions are kept in self.instructions; with one, self.instructions
+        # holds those not written yet, and finish() writes the rest
+        self.output = Emitter(output_filename)
+        self.instructions = self.output.lines
+
+        # without a bootstrap, the program runs from address 0 into whatever follows its code
+        self.is_dir = is_dir
         if is_dir:
             self.bootstrap()
+
     
 
     def write(self, code: str) -> None:
-        print(code, file=self.file_stream)
+        if not code.startswith("("):
+            self.rom_words += 1
+
+        self.instructions.append(code)
 
 
     def bootstrap(self) -> None:
-        with open(f'{self.output_file}', "a") as file_stream:
-            self.file_stream = file_stream
-            self.write("@256")
+        self.write("@256")
+        self.write("D=A")
+        self.write("@SP")
+        self.write("M=D")
+        self.current_caller = "Bootstrap"
+        self.call_function("Sys.init", 0)
+
+
+    def finish(self) -> None:
+        """
+        Writes the shared routines used by the translated code, and the output file. The routines go last,
+        so execution never starts inside one; a single file, which has no Sys.init to end in Sys.halt, ends in
+        a loop in front of them.
+        """
+        routines = (self.shared_calls and (self.call_sites or self.return_sites)) or self.used_comparisons \
+            or "Math.multiply" in self.intrinsic_calls or "Math.divide" in self.intrinsic_calls
+        if routines and not self.is_dir:
+            self.write_end_loop()
+
+        # $$DIVIDE calls Sys.error, so it goes before the call routine it may need
+        if "Math.multiply" in self.intrinsic_calls:
+            self.write_multiply_routine()
+        if "Math.divide" in self.intrinsic_calls:
+            self.write_divide_routine()
+
+        if self.shared_calls and self.call_sites:
+            self.write_call_routine()
+        if self.shared_calls and self.return_sites:
+            self.write_return_routine()
+
+        for cmd in self.comparison_jumps:
+            if cmd in self.used_comparisons:
+                self.write_comparison_routine(cmd)
+
+        self.output.close()
+
+
+    def write_end_loop(self) -> None:
+        self.write("($$END)")
+        self.write("@$$END")
+        self.write("0;JMP")
+
+
+    def write_call_routine(self) -> None:
+        # $$CALL expects the return address in D, 5 + nArgs in R13 and the function's address in R14
+        self.write("($$CALL)")
+        self.push()
+
+        for pointer in self.saved_pointers:
+            self.write(pointer)
+            self.write("D=M")
+            self.push()
+
+        # ARG = SP - 5 - nArgs
+        self.write(self.R1)
+        self.write("D=M")
+        self.write("@SP")
+        self.write("D=M-D")
+        self.write("@ARG")
+        self.write("M=D")
+
+        # LCL = SP
+        self.write("@SP")
+        self.write("D=M")
+        self.write("@LCL")
+        self.write("M=D")
+
+        self.write(self.R2)
+        self.write("A=M")
+        self.write("0;JMP")
+
+
+    def write_return_routine(self) -> None:
+        self.write("($$RETURN)")
+        self.write_return()
+
+
+    def write_comparison_routine(self, cmd: str) -> None:
+        # $$EQ/$$GT/$$LT expect the return address in D and replace the top two stack values with the result
+        self.write(f'($${cmd.upper()})')
+        self.write(self.R3)
+        self.write("M=D")
+
+        self.write("@SP")
+        self.write("AM=M-1")
+        self.write("D=M")
+        self.write("A=A-1")
+        self.write("D=M-D")
+        self.write("M=-1") # assume true, the result goes where the first operand was
+        self.write(f'@$${cmd.upper()}_END')
+        self.write(f'D;{self.comparison_jumps[cmd]}')
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=0")
+
+        self.write(f'($${cmd.upper()}_END)')
+        self.write(self.R3)
+        self.write("A=M")
+        self.write("0;JMP")
+
+
+    def call_comparison(self, cmd: str) -> None:
+        self.shared_compares += 1
+        self.used_comparisons.add(cmd)
+        return_address = self.file_label(f'RET_{cmd.upper()}')
+        self.op_count += 1
+
+        self.write(f'@{return_address}')
+        self.write("D=A")
+        self.write(f'@$${cmd.upper()}')
+        self.write("0;JMP")
+        self.write(f'({return_address})')
+
+
+    def fuse_comparison(self, commands: List[List], i: int) -> int:
+        """
+        Translates eq/gt/lt followed by if-goto (or by not and if-goto) into one conditional jump,
+        and returns the number of commands consumed (0 if the commands at i cannot be fused).
+        """
+        cmd = commands[i][0]
+        if cmd not in self.comparison_jumps:
+            return 0
+
+        negated = commands[i+1:i+2] == [["not"]]
+        j = i + 2 if negated else i + 1
+        if j >= len(commands) or commands[j][0] != "if-goto":
+            return 0
+
+        self.fused_compares += 1
+        self.fused_negations += negated
+        self.write_comparison_jump(cmd, commands[j][1], negated)
+        return j - i + 1
+
+
+    def write_comparison_jump(self, cmd: str, label: str, negated: bool) -> None:
+        self.pop()
+        self.write("D=M")
+        self.pop()
+        self.write("D=M-D")
+        self.write(f'@{self.get_full_label(label)}')
+        self.write(f'D;{(self.inverted_jumps if negated else self.comparison_jumps)[cmd]}')
+
+
+    def is_intrinsic(self, name: str, n_args: str) -> bool:
+        return self.intrinsics and self.intrinsic_functions.get(name) == int(n_args)
+
+
+    def write_intrinsic(self, name: str) -> None:
+        """Replaces the arguments on the stack with the function's result, as a call would."""
+        self.intrinsic_calls[name] = self.intrinsic_calls.get(name, 0) + 1
+
+        if name in self.shared_intrinsics:
+            return_address = self.file_label(f'RET_{self.shared_intrinsics[name][2:]}')
+            self.op_count += 1
+
+            self.write(f'@{return_address}')
             self.write("D=A")
-            self.write("@SP")
-            self.write("M=D")
-            self.current_caller = "Bootstrap"
-            self.call_function("Sys.init", 0)
+            self.write(f'@{self.shared_intrinsics[name]}')
+            self.write("0;JMP")
+            self.write(f'({return_address})')
+        elif name == "Memory.peek":
+            self.write_peek()
+        elif name == "Memory.poke":
+            self.write_poke()
+        elif name == "Math.abs":
+            self.write_abs()
+        else:
+            self.write_min_max(name)
+
+
+    def write_peek(self) -> None:
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("A=M")
+        self.write("D=M")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=D")
+
+
+    def write_poke(self) -> None:
+        # RAM[address] = value, and the address is replaced by the void return value 0
+        self.pop()
+        self.write("D=M")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("A=M")
+        self.write("M=D")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=0")
+
+
+    def write_abs(self) -> None:
+        end = self.file_label("ABS_END")
+        self.op_count += 1
+
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("D=M")
+        self.write(f'@{end}')
+        self.write("D;JGE")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=-D")
+        self.write(f'({end})')
+
+
+    def write_min_max(self, name: str) -> None:
+        # keep x if x - y <= 0 for min (>= 0 for max), like the "x < y" of the OS code, otherwise replace it by y
+        end = self.file_label(f'{name[5:].upper()}_END')
+        self.op_count += 1
+
+        self.write("@SP")
+        self.write("AM=M-1")
+        self.write("D=M")
+        self.write("A=A-1")
+        self.write("D=M-D")
+        self.write(f'@{end}')
+        self.write("D;JLE" if name == "Math.min" else "D;JGE")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("D=M")
+        self.write("A=A-1")
+        self.write("M=D")
+        self.write(f'({end})')
+
+
+    def write_multiply_routine(self) -> None:
+        """
+        $$MULTIPLY expects the return address in D. x is in R13, y in R14, the sum builds up in the result
+        slot and the bit mask is kept in the free slot above the stack. Each set bit of y is cleared as it is
+        added, so the loop ends after the highest one.
+        """
+        self.write("($$MULTIPLY)")
+        self.write(self.R3)
+        self.write("M=D")
+
+        self.pop()
+        self.write("D=M")
+        self.write(self.R2)
+        self.write("M=D")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("D=M")
+        self.write(self.R1)
+        self.write("M=D")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=0")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("M=1")
+
+        # x * y = -x * -y, so that small negative multipliers take few iterations too
+        self.write(self.R2)
+        self.write("D=M")
+        self.write("@$$MULTIPLY_LOOP")
+        self.write("D;JGE")
+        self.write(self.R2)
+        self.write("M=-M")
+        self.write(self.R1)
+        self.write("M=-M")
+
+        self.write("($$MULTIPLY_LOOP)")
+        self.write(self.R2)
+        self.write("D=M")
+        self.write("@$$MULTIPLY_END")
+        self.write("D;JEQ")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("D=D&M")
+        self.write("@$$MULTIPLY_NEXT")
+        self.write("D;JEQ")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("D=M")
+        self.write(self.R2)
+        self.write("M=M-D")
+        self.write(self.R1)
+        self.write("D=M")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=D+M")
+
+        self.write("($$MULTIPLY_NEXT)")
+        self.write(self.R1)
+        self.write("D=M")
+        self.write("M=D+M")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("D=M")
+        self.write("M=D+M")
+        self.write("@$$MULTIPLY_LOOP")
+        self.write("0;JMP")
+
+        self.write("($$MULTIPLY_END)")
+        self.write(self.R3)
+        self.write("A=M")
+        self.write("0;JMP")
+
+
+    def write_divide_routine(self) -> None:
+        """
+        $$DIVIDE expects the return address in D and truncates toward zero. |x| is in R13, the quotient builds up in
+        the result slot, the slot above the stack says whether to negate it and the next one holds 1 to add to it when
+        x is -32768. The multiples |y|, 2|y|, 4|y|... up to |x| are stored above those, R14 pointing at the last one,
+        and then subtracted from the largest down as in long division. Division by zero calls Sys.error(3), as
+        Math.divide does.
+        """
+        self.write("($$DIVIDE)")
+        self.write(self.R3)
+        self.write("M=D")
+
+        self.pop()
+        self.write("D=M")
+        self.write(self.R2)
+        self.write("M=D")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("M=0")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("D=M")
+        self.write(self.R1)
+        self.write("M=D")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=0")
+
+        self.write(self.R1)
+        self.write("D=M")
+        self.write("@$$DIVIDE_X")
+        self.write("D;JGE")
+        self.write(self.R1)
+        self.write("M=-M")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("M=!M")
+
+        self.write("($$DIVIDE_X)")
+        self.write(self.R2)
+        self.write("D=M")
+        self.write("@$$DIVIDE_Y")
+        self.write("D;JGE")
+        self.write("D=-D")
+        self.write("@SP")
+        self.write("A=M")
+        self.write("M=!M")
+
+        # D = |y|
+        self.write("($$DIVIDE_Y)")
+        self.write("@$$DIVIDE_BY_ZERO")
+        self.write("D;JEQ")
+        self.write("@SP")
+        self.write("A=M+1")
+        self.write("M=0")
+        self.write("A=A+1")
+        self.write("M=D")
+        self.write("D=A")
+        self.write(self.R2)
+        self.write("M=D")
+
+        # -32768 has no positive counterpart: divide -32768 + |y| instead, and add 1 to the quotient
+        self.write(self.R1)
+        self.write("D=M")
+        self.write("@$$DIVIDE_UP")
+        self.write("D;JGE")
+        self.write(self.R2)
+        self.write("A=M")
+        self.write("D=M")
+        self.write(self.R1)
+        self.write("M=M-D")
+        self.write("@SP")
+        self.write("A=M+1")
+        self.write("M=1")
+
+        # store the next multiple while it neither overflows nor exceeds |x|
+        self.write("($$DIVIDE_UP)")
+        self.write(self.R2)
+        self.write("A=M")
+        self.write("D=M")
+        self.write("D=D+M")
+        self.write("@$$DIVIDE_DOWN")
+        self.write("D;JLE")
+        self.write(self.R1)
+        self.write("D=D-M")
+        self.write("@$$DIVIDE_DOWN")
+        self.write("D;JGT")
+        self.write(self.R1)
+        self.write("D=D+M")
+        self.write(self.R2)
+        self.write("M=M+1")
+        self.write("A=M")
+        self.write("M=D")
+        self.write("@$$DIVIDE_UP")
+        self.write("0;JMP")
+
+        # quotient = 2 * quotient, plus 1 if the multiple fits in what is left of |x|
+        self.write("($$DIVIDE_DOWN)")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("D=M")
+        self.write("M=D+M")
+        self.write(self.R2)
+        self.write("A=M")
+        self.write("D=M")
+        self.write(self.R1)
+        self.write("D=M-D")
+        self.write("@$$DIVIDE_NEXT")
+        self.write("D;JLT")
+        self.write(self.R1)
+        self.write("M=D")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=M+1")
+
+        self.write("($$DIVIDE_NEXT)")
+        self.write(self.R2)
+        self.write("M=M-1")
+        self.write("D=M")
+        self.write("@SP")
+        self.write("D=D-M")
+        self.write("D=D-1")
+        self.write("@$$DIVIDE_DOWN")
+        self.write("D;JGT")
+
+        self.write("@SP")
+        self.write("A=M+1")
+        self.write("D=M")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=D+M")
+
+        self.write("@SP")
+        self.write("A=M")
+        self.write("D=M")
+        self.write("@$$DIVIDE_RETURN")
+        self.write("D;JEQ")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=-M")
+
+        self.write("($$DIVIDE_RETURN)")
+        self.write(self.R3)
+        self.write("A=M")
+        self.write("0;JMP")
+
+        # Sys.error halts, so the call never returns here
+        self.write("($$DIVIDE_BY_ZERO)")
+        self.write("@3")
+        self.write("D=A")
+        self.write("@SP")
+        self.write("A=M-1")
+        self.write("M=D")
+        self.current_caller = "$$DIVIDE"
+        self.call_function("Sys.error", 1)
 
 
     def translate(self, input_file: str) -> None:
+        self.link(self.translate_fragment(input_file))
+
+
+    def translate_files(self, input_files: List[str], jobs: Optional[int] = None) -> None:
+        """
+        Translates and links files in the given order. With jobs, the files missing from the cache are translated
+        in up to that many worker processes (0 = one per CPU); the fragments are still linked in the given order,
+        so the output is the same as translating them one by one. With drop_unreachable or inline_threshold, the
+        files are taken as the whole program.
+        """
+        functions = self.read_functions(input_files) if self.drop_unreachable or self.inline_threshold else {}
+        candidates = self.inline_candidates(functions)
+        unreachable = self.unreachable_functions(functions, candidates) if self.drop_unreachable else {}
+        dropped = [unreachable.get(input_file, ()) for input_file in input_files]
+        inlined = [self.inlined_into(input_file, functions, candidates) for input_file in input_files]
+
+        if jobs is None:
+            for input_file, names, bodies in zip(input_files, dropped, inlined):
+                self.link(self.translate_fragment(input_file, names, bodies))
+            return
+
+        fragments = [self.cached_fragment(*plan) for plan in zip(input_files, dropped, inlined)]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+
+        # the workers get a copy of a translator with the same options, but no output or cache
+        worker = Translate(shared_calls=self.shared_calls, compact_compare=self.compact_compare, intrinsics=self.intrinsics)
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            translated = iter(list(executor.map(worker.new_fragment, [input_files[i] for i in missing], [dropped[i] for i in missing],
+                                                [inlined[i] for i in missing])))
+
+        for fragment in fragments:
+            if fragment is None:
+                fragment = next(translated)
+                self.store_fragment(fragment)
+            self.link(fragment)
+
+
+    def translate_fragment(self, input_file: str, dropped: Tuple[str, ...] = (), inlined: Optional[Dict[str, List[List]]] = None) -> Fragment:
+        """
+        Translates a .vm file independently of the files translated before it, or takes it from the cache,
+        without the functions named in dropped and with the calls of the functions in inlined replaced by their bodies.
+        """
+        fragment = self.cached_fragment(input_file, dropped, inlined)
+        if fragment is None:
+            fragment = self.new_fragment(input_file, dropped, inlined)
+            self.store_fragment(fragment)
+
+        return fragment
+
+
+    def fragment_key(self, input_file: str, dropped: Tuple[str, ...], inlined: Dict[str, List[List]]) -> str:
+        return BuildCache.key("vm", code_version(translator_modules), self.shared_calls, self.compact_compare, self.intrinsics,
+                              " ".join(dropped), json.dumps(inlined, sort_keys=True), Path(input_file).name, Path(input_file).read_bytes())
+
+
+    def cached_fragment(self, input_file: str, dropped: Tuple[str, ...] = (), inlined: Optional[Dict[str, List[List]]] = None) -> Optional[Fragment]:
+        if self.cache is None:
+            return None
+
+        entry = self.cache.get(self.fragment_key(input_file, dropped, inlined or {}))
+        return Fragment(**entry)._replace(source=input_file) if entry is not None else None
+
+
+    def store_fragment(self, fragment: Fragment) -> None:
+        if self.cache is not None:
+            self.cache.put(self.fragment_key(fragment.source, tuple(fragment.dropped), fragment.inlined), fragment._asdict())
+
+
+    def new_fragment(self, input_file: str, dropped: Tuple[str, ...] = (), inlined: Optional[Dict[str, List[List]]] = None) -> Fragment:
+        """
+        Translates a .vm file on a scratch translator with the same options, without the functions named in dropped
+        and with the calls of the functions in inlined replaced by their bodies. The code of an inlined call is
+        mapped to its call command.
+        """
+        commands = self.read_commands(input_file)
+        scratch = Translate(shared_calls=self.shared_calls, compact_compare=self.compact_compare, intrinsics=self.intrinsics)
+        expanded, origins = scratch.inline_calls(commands, inlined or {})
+
+        kept = [i for i, function in enumerate(self.functions_of(expanded)) if function not in dropped]
+        words = [0] * len(commands)
+        for i, command_words in zip(kept, scratch.translate_commands(input_file, [expanded[i] for i in kept])):
+            words[origins[i]] += command_words
+
+        return Fragment(input_file, scratch.instructions, words, { name: getattr(scratch, name) for name in self.fragment_counters },
+                        scratch.intrinsic_calls, sorted(scratch.used_comparisons), list(dropped), inlined or {})
+
+
+    @staticmethod
+    def functions_of(commands: List[List]) -> List[Optional[str]]:
+        """The name of the function each command belongs to (None before the first function command)."""
+        functions = []
+        function = None
+        for command in commands:
+            if command[0] == "function":
+                function = command[1]
+            functions.append(function)
+
+        return functions
+
+
+    def read_functions(self, input_files: List[str]) -> Dict[str, Tuple[str, List[List]]]:
+        """The file and the commands of every function of the files, from its function command on."""
+        functions = {}
+        for input_file in input_files:
+            commands = self.read_commands(input_file)
+            for command, function in zip(commands, self.functions_of(commands)):
+                if function is not None:
+                    functions.setdefault(function, (input_file, []))[1].append(command)
+
+        return functions
+
+
+    def unreachable_functions(self, functions: Dict[str, Tuple[str, List[List]]], candidates: Dict[str, List[List]]) -> Dict[str, Tuple[str, ...]]:
+        """
+        Whole-program pass over the VM code of a directory: builds the call graph of its functions and returns, for
+        each file, the functions that cannot be reached through calls from Sys.init. Calls translated as intrinsics or
+        inlined are not edges, but the functions the intrinsics' routines call are reached. A program without Sys.init
+        is entered some other way, and nothing is dropped.
+        """
+        if "Sys.init" not in functions:
+            return {}
+
+        reachable = set()
+        pending = ["Sys.init"]
+        while pending:
+            function = pending.pop()
+            # calls to functions no file defines are left for the assembler to report
+            if function in reachable or function not in functions:
+                continue
+
+            reachable.add(function)
+            input_file, commands = functions[function]
+            for command in commands:
+                if command[0] != "call":
+                    continue
+                if self.is_intrinsic(command[1], command[2]):
+                    if command[1] in self.intrinsic_callees:
+                        pending.append(self.intrinsic_callees[command[1]])
+                elif not self.inlines(command, input_file, functions, candidates):
+                    pending.append(command[1])
+
+        unreachable = {}
+        for function, (input_file, _) in functions.items():
+            if function not in reachable:
+                unreachable.setdefault(input_file, []).append(function)
+
+        return { input_file: tuple(names) for input_file, names in unreachable.items() }
+
+
+    def inline_candidates(self, functions: Dict[str, Tuple[str, List[List]]]) -> Dict[str, List[List]]:
+        """
+        The functions calls to which are replaced by their bodies: leaf functions (that call nothing but intrinsics,
+        so they are never recursive) without loops, of at most inline_threshold commands, not counting their function
+        command.
+        """
+        candidates = {}
+        for function, (_, commands) in functions.items():
+            body = commands[1:]
+            if function != "Sys.init" and 0 < len(body) <= self.inline_threshold and body[-1] == ["return"] \
+                    and all(command[0] != "call" or self.is_intrinsic(command[1], command[2]) for command in body) \
+                    and not self.has_loop(body):
+                candidates[function] = commands
+
+        return candidates
+
+
+    @staticmethod
+    def has_loop(commands: List[List]) -> bool:
+        """Whether the commands jump back to a label before the jump. The call of a loop costs little next to the loop
+        (and Sys.halt never returns), so those functions are not inlined."""
+        labels = set()
+        for command in commands:
+            if command[0] == "label":
+                labels.add(command[1])
+            elif command[0] in ("goto", "if-goto") and command[1] in labels:
+                return True
+
+        return False
+
+
+    def inlines(self, call: List, input_file: str, functions: Dict[str, Tuple[str, List[List]]], candidates: Dict[str, List[List]]) -> bool:
+        """Whether a call command in input_file is inlined. Static variables belong to a file, so a function that uses
+        them is only inlined in its own file."""
+        function = call[1]
+        return function in candidates and not self.is_intrinsic(function, call[2]) \
+            and (functions[function][0] == input_file or all(command[1:2] != ["static"] for command in candidates[function]))
+
+
+    def inlined_into(self, input_file: str, functions: Dict[str, Tuple[str, List[List]]], candidates: Dict[str, List[List]]) -> Dict[str, List[List]]:
+        """The functions inlined in a file, with their commands."""
+        return { command[1]: candidates[command[1]] for caller_file, commands in functions.values() if caller_file == input_file
+                 for command in commands if command[0] == "call" and self.inlines(command, input_file, functions, candidates) }
+
+
+    def inline_calls(self, commands: List[List], inlined: Dict[str, List[List]]) -> Tuple[List[List], List[int]]:
+        """
+        Replaces the calls of the functions in inlined by their bodies, and returns the new commands with the index
+        of the command each one comes from. The inlined bodies work in locals added to their caller's frame; a
+        caller's inlined calls run one after the other, so they share those locals.
+        """
+        expanded, origins = [], []
+        # the pointers each function reads, through the this/that segments or directly: only those are saved
+        live_pointers = {}
+        for command, function in zip(commands, self.functions_of(commands)):
+            if command[0] in ("push", "pop") and command[1] in ("this", "that"):
+                live_pointers.setdefault(function, set()).add(("this", "that").index(command[1]))
+            elif command[:2] == ["push", "pointer"]:
+                live_pointers.setdefault(function, set()).add(command[2])
+
+        caller, base = None, 0
+        for origin, command in enumerate(commands):
+            if command[0] == "function":
+                caller, base = len(expanded), int(command[2])
+                expanded.append(list(command))
+                origins.append(origin)
+                continue
+
+            if command[0] != "call" or command[1] not in inlined or self.is_intrinsic(command[1], command[2]):
+                expanded.append(command)
+                origins.append(origin)
+                continue
+
+            code, slots = self.inline_body(inlined[command[1]], int(command[2]), base, live_pointers.get(expanded[caller][1], set()),
+                                           f'INLINE{self.inlined_calls}')
+            expanded[caller][2] = str(max(int(expanded[caller][2]), base + slots))
+            expanded += code
+            origins += [origin] * len(code)
+            self.inlined_calls += 1
+
+        return expanded, origins
+
+
+    @staticmethod
+    def inline_body(commands: List[List], n_args: int, base: int, live_pointers: Set[int], prefix: str) -> Tuple[List[List], int]:
+        """
+        The commands that replace a call of the function with the given commands, and the number of locals they use
+        in the caller's frame from local base on: first the arguments, then the function's own locals (set to 0),
+        then THIS and THAT when the function sets them and the caller reads them later. Those pointers are saved
+        before the body and restored after it. The labels of the body get the prefix, and a return before its end
+        jumps to the end; the return value is left on the stack, as after a call. Like the rest of the
+        translator, this relies on the stack holding only the return value at a return.
+        """
+        header, body = commands[0], commands[1:]
+        n_locals = int(header[2])
+        saved = sorted({ command[2] for command in body if command[:2] == ["pop", "pointer"] } & live_pointers)
+
+        # a single argument is on top of the stack: when the body starts by pushing it and never uses it again, it stays there
+        references = [i for i, command in enumerate(body) if command[1:3] == ["argument", n_args - 1]]
+        on_stack = n_args == 1 and references == [0] and body[0][0] == "push"
+
+        locals_start = base + n_args - on_stack
+        saved_start = locals_start + n_locals
+
+        code = [["pop", "local", base + i] for i in reversed(range(n_args - on_stack))]
+        for j in range(n_locals):
+            code += [["push", "constant", 0], ["pop", "local", locals_start + j]]
+        for k, pointer in enumerate(saved):
+            code += [["push", "pointer", pointer], ["pop", "local", saved_start + k]]
+
+        ends = False
+        for i, command in enumerate(body):
+            if on_stack and i == 0:
+                continue
+            if command[0] in ("push", "pop") and command[1] == "argument":
+                code.append([command[0], "local", base + command[2]])
+            elif command[0] in ("push", "pop") and command[1] == "local":
+                code.append([command[0], "local", locals_start + command[2]])
+            elif command[0] in ("label", "goto", "if-goto"):
+                code.append([command[0], f'{prefix}.{command[1]}'])
+            elif command[0] == "return":
+                if i < len(body) - 1:
+                    code.append(["goto", f'{prefix}.END'])
+                    ends = True
+            else:
+                code.append(command)
+
+        if ends:
+            code.append(["label", f'{prefix}.END'])
+        for k, pointer in enumerate(saved):
+            code += [["push", "local", saved_start + k], ["pop", "pointer", pointer]]
+
+        return code, saved_start + len(saved) - base
+
+
+    def translate_commands(self, input_file: str, commands: List[List]) -> List[int]:
+        """Writes the code of a file's commands and returns the ROM words of each command."""
         self.ref = input_file.rsplit("/", 1)[-1][:-3]
+        words = []
 
+        i = 0
+        while i < len(commands):
+            start = self.rom_words
+            fused = self.fuse_comparison(commands, i) if self.compact_compare else 0
+            if fused:
+                # the code of fused commands is mapped to the first of them
+                words += [self.rom_words - start] + [0] * (fused - 1)
+                i += fused
+                continue
+
+            self.write_to_asm(commands[i])
+            words.append(self.rom_words - start)
+            i += 1
+
+        return words
+
+
+    def link(self, fragment: Fragment) -> None:
+        """Appends a translated file to the program, after the bootstrap and the files linked before it."""
+        self.mapped_files.append((fragment.source, self.rom_words, fragment.words))
+        self.rom_words += sum(fragment.words)
+
+        for name, count in fragment.counters.items():
+            setattr(self, name, getattr(self, name) + count)
+        for name, count in fragment.intrinsic_calls.items():
+            self.intrinsic_calls[name] = self.intrinsic_calls.get(name, 0) + count
+        self.used_comparisons.update(fragment.used_comparisons)
+        if fragment.dropped:
+            self.dropped_functions[fragment.source] = fragment.dropped
+        self.inlined_functions.update(fragment.inlined)
+
+        self.output.extend(fragment.code)
+
+
+    @classmethod
+    def read_commands(cls, input_file: str) -> List[List]:
+        """Parses every command of a .vm file, without comments or blank lines."""
         with open(input_file, "r") as file:
             contents = file.read()
 
-        lines = contents.splitlines()
+        commands = []
+        for line in contents.splitlines():
+            stripped_line = line.partition("//")[0].strip()
 
-        with open(f'{self.output_file}', "a") as file_stream:
-            self.file_stream = file_stream
+            if not stripped_line:
+                continue
 
-            for line in lines:
-                stripped_line = line.partition("//")[0].strip()
-                
-                if not stripped_line:
-                    continue
+            commands.append(cls.parse(stripped_line))
+
+        return commands
 
-                parsed_components = self.parse(stripped_line)
-                self.write_to_asm(parsed_components)
-    
 
-    def parse(self, line: str) -> List:
+    @classmethod
+    def parse(cls, line: str) -> List:
         components = line.split()
         cmd = components[0]
 
-        if cmd not in self.valid_cmds:
+        if cmd not in cls.valid_cmds:
             print(f"Error: '{cmd}' is not a valid command.")
             sys.exit(1)
 
         if cmd in ["pop", "push"]:
             _, segment, val = components
 
-            if segment not in self.valid_segments:
+            if segment not in cls.valid_segments:
                 print(f"Error: '{segment}' is not a valid memory segment.")
                 sys.exit(1)
             
-            if not val.isdigit:
+            if not val.isdigit():
                 print(f"Error: '{val}' is an invalid value.")
                 sys.exit(1)
             
@@ -222,6 +1070,10 @@ class Translate:
         self.write("M=M+1")
     
     def perform_arithmetic(self, cmd: str) -> None:
+        if self.compact_compare and cmd in self.comparison_jumps:
+            self.call_comparison(cmd)
+            return
+
         self.pop()
         self.write("D=M")
 
@@ -257,7 +1109,7 @@ class Translate:
             self.write("D=D|M")
         else:
             self.write("D=M-D")
-            self.write(f"@SET_TRUE{self.op_count}")
+            self.write(f'@{self.file_label("SET_TRUE")}')
 
             if cmd == "eq":
                 self.write("D;JEQ")
@@ -267,18 +1119,23 @@ class Translate:
                 self.write("D;JLT")
 
             self.write("D=0") # set D to false
-            self.write(f"@END{self.op_count}")
+            self.write(f'@{self.file_label("END")}')
             self.write("0;JMP")
 
-            self.write(f"(SET_TRUE{self.op_count})")
+            self.write(f'({self.file_label("SET_TRUE")})')
             self.write("D=-1") # set D to true (-1, aka 1111111111111111)
 
-            self.write(f"(END{self.op_count})")
+            self.write(f'({self.file_label("END")})')
             self.op_count += 1
 
         self.push()
     
 
+    def file_label(self, name: str) -> str:
+        """Label number op_count of the current file. Labels are numbered per file, so a file's code does not depend on the others."""
+        return f'{self.ref}${name}.{self.op_count}'
+
+
     def get_full_label(self, label: str) -> str:
         prefix = f'{self.current_caller}$' if self.current_caller else ""
         return prefix + label
@@ -293,6 +1150,24 @@ class Translate:
             self.caller_count[caller] = self.caller_count.setdefault(caller, 0) + 1
             return_address = f'{caller}$ret.{self.caller_count[caller]}'
 
+        self.call_sites += 1
+
+        if self.shared_calls:
+            self.write(f'@{5 + int(n_args)}')
+            self.write("D=A")
+            self.write(self.R1)
+            self.write("M=D")
+            self.write(f'@{name}')
+            self.write("D=A")
+            self.write(self.R2)
+            self.write("M=D")
+            self.write(f'@{return_address}')
+            self.write("D=A")
+            self.write("@$$CALL")
+            self.write("0;JMP")
+            self.write(f'({return_address})')
+            return
+
         # push return address
         self.write(f'@{return_address}')
         self.write("D=A")
@@ -327,6 +1202,16 @@ class Translate:
     
 
     def return_function(self) -> None:
+        self.return_sites += 1
+
+        if self.shared_calls:
+            self.write("@$$RETURN")
+            self.write("0;JMP")
+        else:
+            self.write_return()
+
+
+    def write_return(self) -> None:
         # save LCL to Register 1
         self.write("@LCL")
         self.write("D=M")
@@ -404,18 +1289,159 @@ class Translate:
             self.current_caller = name
         elif cmd == "call":
             function_name, n_args = components[1:]
-            self.call_function(function_name, int(n_args))
+            if self.is_intrinsic(function_name, n_args):
+                self.write_intrinsic(function_name)
+            else:
+                self.call_function(function_name, int(n_args))
         else:
             print(f"Error: the command '{segment}' has not been implemented yet.")
             sys.exit(1)
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python VMTranslator.py [filename|directory]")
-        sys.exit(1)
+def write_source_map(translator: Translate, output_filename: str) -> None:
+    """
+    Writes the ROM addresses of every translated VM command, with the Jack line each one came from when the
+    compiler left a <Name>.vm.map next to the .vm file. For each file: "start" is its first ROM address,
+    "words" the ROM words of each of its VM commands in order, and "lines" the run-length encoded Jack
+    lines of its commands. See SourceMap.
+    """
+    files = []
+    for input_file, start, words in translator.mapped_files:
+        mapped_file = { "vm": Path(input_file).name, "start": start, "words": words }
+
+        jack_map = Path(input_file + ".map")
+        if jack_map.is_file():
+            jack_lines = json.loads(jack_map.read_text())
+            if sum(jack_lines["lines"][1::2]) == len(words):
+                mapped_file["source"] = jack_lines["source"]
+                mapped_file["lines"] = jack_lines["lines"]
+            else:
+                print(f"Warning: '{jack_map}' does not match '{input_file}', recompile it with --source-map.")
+
+        files.append(mapped_file)
+
+    with open(output_filename, "w") as file:
+        json.dump({ "version": 1, "files": files }, file, separators=(",", ":"))
+
+
+def measure(emit) -> int:
+    """ROM words written by emit(translator) on a scratch translator."""
+    translator = Translate()
+    translator.current_caller = "Measure"
+    emit(translator)
+    return translator.rom_words
+
+
+def report_shared_calls(translator: Translate) -> None:
+    def sizes(shared_calls: bool) -> Tuple[int, int]:
+        def set_mode(scratch: Translate) -> Translate:
+            scratch.shared_calls = shared_calls
+            return scratch
+
+        return measure(lambda t: set_mode(t).call_function("f", 1)), measure(lambda t: set_mode(t).return_function())
+
+    (inline_call, inline_return), (shared_call, shared_return) = sizes(False), sizes(True)
+    call_routine = measure(Translate.write_call_routine) if translator.call_sites else 0
+    return_routine = measure(Translate.write_return_routine) if translator.return_sites else 0
+
+    # frame handling code has no branches, so the words of a sequence are also the cycles it takes to run
+    inline_words = translator.rom_words + translator.call_sites * (inline_call - shared_call) \
+        + translator.return_sites * (inline_return - shared_return) - call_routine - return_routine
 
-    main_arg = sys.argv[1]
+    print(f'Shared call/return routines: {translator.call_sites} call sites, {translator.return_sites} return sites')
+    print(f'ROM: {translator.rom_words} words, {inline_words} with inline frames ({inline_words - translator.rom_words} saved)')
+    print(f'Cost: +{shared_call + call_routine - inline_call} cycles per call, +{shared_return + return_routine - inline_return} cycles per return')
+
+
+def report_compact_compare(translator: Translate) -> None:
+    def compact(scratch: Translate) -> Translate:
+        scratch.compact_compare = True
+        return scratch
+
+    inline_compare = measure(lambda t: t.perform_arithmetic("lt"))
+    inline_branch = measure(lambda t: t.write_to_asm(["if-goto", "L"]))
+    inline_not = measure(lambda t: t.perform_arithmetic("not"))
+    fused = measure(lambda t: t.write_comparison_jump("lt", "L", False))
+    shared = measure(lambda t: compact(t).perform_arithmetic("lt"))
+    routines = sum(measure(lambda t: t.write_comparison_routine(cmd)) for cmd in translator.used_comparisons)
+
+    # a fused comparison also absorbs its if-goto, and its not if it had one
+    inline_words = translator.rom_words + translator.fused_compares * (inline_compare + inline_branch - fused) \
+        + translator.fused_negations * inline_not + translator.shared_compares * (inline_compare - shared) - routines
+
+    print(f'Comparisons: {translator.fused_compares} fused with if-goto, {translator.shared_compares} through shared routines')
+    print(f'ROM: {translator.rom_words} words, {inline_words} with inline comparisons ({inline_words - translator.rom_words} saved)')
+    print(f'Fused comparison + (not +) if-goto: {fused} words instead of {inline_compare + inline_branch} (+{inline_not})')
+
+
+def report_unreachable(translator: Translate) -> None:
+    # the dropped functions translated on their own, without the shared routines only they would have needed
+    dropped_words = 0
+    for input_file, dropped in translator.dropped_functions.items():
+        commands = Translate.read_commands(input_file)
+        scratch = Translate(shared_calls=translator.shared_calls, compact_compare=translator.compact_compare, intrinsics=translator.intrinsics)
+        scratch.translate_commands(input_file, [command for command, function in zip(commands, Translate.functions_of(commands))
+                                                if function in dropped])
+        dropped_words += scratch.rom_words
+
+    count = sum(len(dropped) for dropped in translator.dropped_functions.values())
+    print(f'Unreachable functions: {count} dropped, in {len(translator.dropped_functions)} files')
+    print(f'ROM: {translator.rom_words} words, {translator.rom_words + dropped_words} with them ({dropped_words} saved)')
+
+
+def report_inlining(translator: Translate) -> None:
+    # the same program without inlining, with the other options unchanged
+    plain = Translate("", True, translator.shared_calls, translator.compact_compare, translator.intrinsics,
+                      drop_unreachable=translator.drop_unreachable)
+    plain.translate_files([input_file for input_file, _, _ in translator.mapped_files])
+    plain.finish()
+
+    def frame_cycles(scratch: Translate) -> int:
+        scratch.shared_calls = translator.shared_calls
+        scratch.call_function("f", 1)
+        scratch.return_function()
+        if translator.shared_calls:
+            scratch.write_call_routine()
+            scratch.write_return_routine()
+        return scratch
+
+    added_words = translator.rom_words - plain.rom_words
+    print(f'Inlining: {translator.inlined_calls} calls of {len(translator.inlined_functions)} functions of at most {translator.inline_threshold} commands')
+    print(f'ROM: {translator.rom_words} words, {plain.rom_words} without inlining ({added_words:+} words, '
+          f'{added_words / max(translator.inlined_calls, 1):+.1f} per inlined call)')
+    # frame handling code has no branches, so its words are also the cycles it takes to run; an inlined body pops
+    # its arguments, clears its locals and saves THIS/THAT instead, which takes part of that back
+    print(f'Cost: at most -{measure(frame_cycles)} cycles of call/return frame code per inlined call '
+          f'(benchmarks/bench_inline.py measures the actual difference)')
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python VMTranslator.py [filename|directory] [--shared-calls] [--compact-compare] [--intrinsics] [--drop-unreachable] [--inline [N]] [--source-map] [--cache [DIR]] [--jobs N] [--hack|--binary]")
+    parser.add_argument("path")
+    parser.add_argument("--shared-calls", action="store_true",
+                        help="jump to one shared copy of the call/return frame code instead of inlining it at every call and return")
+    parser.add_argument("--compact-compare", action="store_true",
+                        help="fuse eq/gt/lt with a following if-goto into one jump, and share the code of the other comparisons")
+    parser.add_argument("--intrinsics", action="store_true",
+                        help="translate calls to Math.multiply/divide/abs/min/max and Memory.peek/poke without a call frame, "
+                             "instead of calling the program's own functions (only for programs built with the bundled OS)")
+    parser.add_argument("--drop-unreachable", action="store_true",
+                        help="leave out the functions of a directory that no chain of calls from Sys.init reaches")
+    parser.add_argument("--inline", nargs="?", type=int, const=8, default=0, metavar="N",
+                        help="replace the calls of leaf functions of at most N VM commands (default 8) of a directory by their bodies")
+    parser.add_argument("--source-map", action="store_true",
+                        help="write <output>.map with the ROM addresses of each VM command (and Jack line, from the compiler's .vm.map files)")
+    parser.add_argument("--cache", nargs="?", const=str(BuildCache.default_directory),
+                        help=f"reuse the translation of .vm files translated before in the same state (default {BuildCache.default_directory})")
+    parser.add_argument("--cache-size", type=int, default=BuildCache.default_max_bytes // 2**20, help="size limit of the cache in MB")
+    parser.add_argument("--jobs", type=int, help="translate the files of a directory in N processes (0 = one per CPU) and report the time taken")
+    parser.add_argument("--hack", action="store_true", help="assemble the translated code in memory and write <Name>.hack instead of <Name>.asm")
+    parser.add_argument("--binary", action="store_true", help="like --hack, but write packed 16-bit words to <Name>.bin")
+    args = parser.parse_args()
+    cache = BuildCache(args.cache, args.cache_size * 2**20) if args.cache else None
+
+    main_arg = args.path
+    assemble = args.hack or args.binary
 
     if main_arg.endswith(".vm"):
         input_filename = main_arg
@@ -424,23 +1450,53 @@ def main():
             sys.exit(1)
 
         output_filename = input_filename[:-3] + ".asm"
-        Translate(output_filename).translate(input_filename)
+        translator = Translate("" if assemble else output_filename, shared_calls=args.shared_calls, compact_compare=args.compact_compare,
+                               intrinsics=args.intrinsics, cache=cache)
+        translator.translate(input_filename)
             
     elif Path(main_arg).is_dir():
         directory = main_arg
         filename = directory.rsplit("/", 1)[-1] + ".asm"
         output_filename = directory + "/" + filename
-        translator = Translate(output_filename, True)
+        translator = Translate("" if assemble else output_filename, True, args.shared_calls, args.compact_compare, args.intrinsics, cache,
+                               args.drop_unreachable, args.inline)
 
-        for file in Path(directory).iterdir():
-            if file.name.endswith(".vm"):
-                input_filename = f'{directory}/{file.name}'
-                translator.translate(input_filename)
+        # sorted, so that the program is laid out the same way whatever order the file system lists the files in
+        input_filenames = [f'{directory}/{file.name}' for file in sorted(Path(directory).iterdir()) if file.name.endswith(".vm")]
+
+        start = time.perf_counter()
+        translator.translate_files(input_filenames, args.jobs)
+        if args.jobs is not None:
+            print(f'Translated {len(input_filenames)} files in {(time.perf_counter() - start) * 1000:.1f} ms')
                 
     else:
         print(f"Error: Input must be a either a filename with .vm extension or a directory")
         sys.exit(1)
 
+    translator.finish()
+
+    if args.binary:
+        output_filename = output_filename[:-4] + ".bin"
+        Assembler(translator.instructions).write_binary(output_filename)
+    elif args.hack:
+        output_filename = output_filename[:-4] + ".hack"
+        Assembler(translator.instructions).write_hack(output_filename)
+
+    if args.source_map:
+        write_source_map(translator, output_filename + ".map")
+
+    if args.shared_calls:
+        report_shared_calls(translator)
+    if args.compact_compare:
+        report_compact_compare(translator)
+    if args.drop_unreachable:
+        report_unreachable(translator)
+    if args.inline:
+        report_inlining(translator)
+    if cache is not None:
+        cache.evict()
+        cache.report("Translation")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
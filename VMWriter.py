@@ -1,5 +1,9 @@
+import json
 from pathlib import Path
 
+from Emitter import Emitter
+from VMOptimizer import optimize_mapped, push_constant
+
 class VMWriter:
 
     operations = { 
@@ -14,20 +18,74 @@ class VMWriter:
         "neg": "neg"
     }
 
-    def __init__(self, output_filename: str):
-        file = Path(output_filename)
-        if file.is_file():
-            file.unlink()
+    def __init__(self, output_filename: str = "", optimizing: bool = False, source_map: bool = False):
+        self.output_filename = output_filename
+
+        # the code is held back until close(), so the compiler can rewrite what it just emitted
+        # and the peephole pass (when optimizing) can see all of it
+        self.optimizing = optimizing
+        self.code = []
+        self.instruction_counts = (0, 0)
+
+        # the Jack line each instruction was compiled from (the compiler sets self.line as it goes),
+        # written to <Name>.vm.map with source_map
+        self.source_map = source_map
+        self.line = 0
+        self.lines = []
 
-        self.output_file = open(output_filename, "w")
+        # without an output filename the code is kept in memory, see getvalue()
+        self.output = Emitter(output_filename)
 
 
     def write(self, code: str) -> None:
-        self.output_file.write(code + "\n")
+        self.code.append(code)
+        self.lines.append(self.line)
+
+
+    def mark(self) -> int:
+        """Position of the next instruction, for use with emitted_since() and truncate()."""
+        return len(self.code)
+
+
+    def emitted_since(self, start: int, end: int = None) -> list:
+        return self.code[start:end]
+
+
+    def truncate(self, start: int, end: int = None) -> None:
+        """Takes back the instructions emitted from start (up to end, if given)."""
+        del self.code[start:end]
+        del self.lines[start:end]
     
 
     def close(self) -> None:
-        self.output_file.close()
+        final_code, final_lines = optimize_mapped(self.code, self.lines) if self.optimizing else (self.code, self.lines)
+        self.instruction_counts = (len(self.code), len(final_code))
+        self.output.extend(final_code)
+        self.output.close()
+
+        if self.source_map and self.output_filename:
+            self.write_source_map(final_lines)
+
+
+    def write_source_map(self, lines: list) -> None:
+        """
+        Writes <Name>.vm.map: the Jack file and, run-length encoded as [line, count, line, count...],
+        the Jack line of each VM instruction of <Name>.vm.
+        """
+        runs = []
+        for line in lines:
+            if runs and runs[-2] == line:
+                runs[-1] += 1
+            else:
+                runs += [line, 1]
+
+        source_map = { "version": 1, "source": Path(self.output_filename).stem + ".jack", "lines": runs }
+        with open(self.output_filename + ".map", "w") as file:
+            json.dump(source_map, file, separators=(",", ":"))
+
+
+    def getvalue(self) -> str:
+        return self.output.getvalue()
 
 
     def push(self, tag: str, value: str) -> None:
@@ -37,6 +95,12 @@ class VMWriter:
             self.write(f'push {tag} {value}')
 
     
+    def push_constant(self, value: int) -> None:
+        """Pushes any 16-bit value, using neg/not for the ones that "push constant" cannot express."""
+        for code in push_constant(value):
+            self.write(code)
+
+    
     def push_variable(self, symbol_tuple) -> None:
         assert len(symbol_tuple) == 4
         
@@ -66,6 +130,16 @@ class VMWriter:
             self.call("String.appendChar", 2)
 
 
+    def push_interned_string(self, value, static_index, built_label) -> None:
+        """Pushes the String held in a static, building it the first time this code runs (statics start out as 0)."""
+        self.write(f'push static {static_index}')
+        self.write(f'if-goto {built_label}')
+        self.push_string(value)
+        self.write(f'pop static {static_index}')
+        self.write(f'label {built_label}')
+        self.write(f'push static {static_index}')
+
+
     def pop_to(self, symbol_tuple) -> None:
         assert len(symbol_tuple) == 4
 
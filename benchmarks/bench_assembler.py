@@ -0,0 +1,53 @@
+"""Assembler speed on the full Pong + OS build, from the translator's in-memory instructions and from .asm text.
+
+The build uses shared call/return and comparison routines, as with inline frames Pong + OS does not fit in ROM, and
+leaves out the OS functions the program never calls.
+
+Usage: python benchmarks/bench_assembler.py [program] [repeats]
+"""
+import sys
+import time
+
+from programs import compile_program, remove, translate_program
+
+from Assembler import Assembler
+
+
+def best_of(repeats: int, run) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    program = sys.argv[1] if len(sys.argv) > 1 else "Pong"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    directory = compile_program(program)
+    try:
+        instructions = translate_program(directory, shared_calls=True, compact_compare=True, drop_unreachable=True).instructions
+        asm_file = directory / f'{program}.asm'
+        asm_file.write_text("".join(line + "\n" for line in instructions))
+
+        words = len(Assembler(instructions).assemble())
+        print(f'{program} + OS: {len(instructions)} lines, {words} words')
+
+        cases = [
+            ("in memory", lambda: Assembler(instructions).assemble()),
+            ("from .asm text", lambda: Assembler.from_file(str(asm_file)).assemble()),
+            ("in memory + .hack", lambda: Assembler(instructions).write_hack(str(directory / f'{program}.hack'))),
+            ("in memory + .bin", lambda: Assembler(instructions).write_binary(str(directory / f'{program}.bin'))),
+        ]
+        for name, run in cases:
+            elapsed = best_of(repeats, run)
+            print(f'{name:20} {elapsed * 1000:8.1f} ms  {words / elapsed / 1e6:6.2f} M words/s')
+    finally:
+        remove(directory)
+
+
+if __name__ == "__main__":
+    main()
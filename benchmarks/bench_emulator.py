@@ -0,0 +1,47 @@
+"""CPU emulator speed on project11 programs built with the OS, until Sys.halt or a cycle limit.
+
+Short runs are dominated by compiling basic blocks the first time they execute; interactive programs such as
+Square never halt and show the steady-state speed.
+
+Usage: python benchmarks/bench_emulator.py [max cycles] [program ...]
+"""
+import sys
+import time
+
+from programs import compile_program, remove, translate_program
+
+from Assembler import Assembler
+from CPUEmulator import CPUEmulator
+
+
+def main():
+    max_cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    programs = sys.argv[2:] or ["Seven", "ConvertToBin", "Square"]
+
+    for program in programs:
+        directory = compile_program(program)
+        try:
+            assembler = Assembler(translate_program(directory, shared_calls=True, compact_compare=True).instructions)
+            rom = assembler.assemble()
+        finally:
+            remove(directory)
+
+        emulator = CPUEmulator(rom, assembler.symbols)
+        # ConvertToBin reads its input from RAM[8000]
+        emulator.ram[8000] = 12345
+
+        stop_at = assembler.symbols["Sys.halt"]
+        start = time.perf_counter()
+        try:
+            cycles = emulator.run(max_cycles, stop_at)
+            status = "halted" if emulator.pc == stop_at else "running"
+        except RuntimeError as error:
+            cycles = emulator.cycles
+            status = f'failed: {error}'
+        elapsed = time.perf_counter() - start
+
+        print(f'{program:14} {len(rom):6} words {cycles:10} cycles {elapsed:7.2f} s {cycles / elapsed / 1e6:6.2f} M instructions/s  {status}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""ROM size and cycles of project11 programs + OS with calls of small leaf functions inlined, at several size thresholds.
+
+The programs are run as in bench_intrinsics: to Sys.halt, or until they have entered the function that draws one
+frame a fixed number of times. Each build is checked to leave the same static variables, heap and screen as the
+build without inlining. Inlining grows the code at every call site, and large thresholds can push a program
+past the ROM.
+
+Usage: python benchmarks/bench_inline.py [threshold ...]
+"""
+import sys
+
+from programs import compile_program, remove, translate_program
+
+from Assembler import Assembler
+from CPUEmulator import CPUEmulator
+
+# program -> (function to stop at, number of times it is entered, key held down)
+stop_points = {
+    "Seven": ("Sys.halt", 1, 0),
+    "ConvertToBin": ("Sys.halt", 1, 0),
+    "ComplexArrays": ("Sys.halt", 1, 0),
+    "Square": ("SquareGame.moveSquare", 40, 132),
+    "Pong": ("PongGame.moveBall", 40, 0),
+}
+
+max_cycles = 500_000_000
+
+
+def run(program: str, directory, threshold: int):
+    translator = translate_program(directory, shared_calls=True, compact_compare=True, drop_unreachable=True,
+                                   inline_threshold=threshold)
+    if translator.rom_words > Assembler.rom_size:
+        return translator.rom_words, None, translator.inlined_calls, None
+
+    assembler = Assembler(translator.instructions)
+    emulator = CPUEmulator(assembler.assemble(), assembler.symbols)
+
+    function, times, key = stop_points[program]
+    stop_at = assembler.symbols[function]
+    # ConvertToBin reads its input from RAM[8000]
+    emulator.ram[8000] = 12345
+    emulator.press(key)
+
+    for _ in range(times):
+        emulator.run(max_cycles - emulator.cycles, stop_at)
+        if emulator.pc != stop_at:
+            raise RuntimeError(f'{program} did not reach {function} within {max_cycles} cycles')
+        # step into the function so that the next run does not stop right away
+        emulator.run(1)
+
+    # the stack and frames differ with inlining, so only the static variables, heap and screen are compared
+    return translator.rom_words, emulator.cycles, translator.inlined_calls, list(emulator.ram[16:256]) + list(emulator.ram[2048:24576])
+
+
+def main():
+    thresholds = [int(arg) for arg in sys.argv[1:]] or [4, 8, 16]
+
+    print(f'{"program":14} {"threshold":>9} {"ROM words":>10} {"cycles":>12} {"speedup":>8}  inlined calls')
+    for program in stop_points:
+        directory = compile_program(program)
+        try:
+            words, cycles, _, ram = run(program, directory, 0)
+            print(f'{program:14} {"-":>9} {words:10} {cycles:12}')
+
+            for threshold in thresholds:
+                inlined_words, inlined_cycles, calls, inlined_ram = run(program, directory, threshold)
+                if inlined_cycles is None:
+                    print(f'{"":14} {threshold:9} {inlined_words:10} {"does not fit in ROM":>21}  {calls}')
+                    continue
+
+                check = "" if inlined_ram == ram else "  WRONG: different RAM"
+                print(f'{"":14} {threshold:9} {inlined_words:10} {inlined_cycles:12} {cycles / inlined_cycles:7.2f}x  {calls}{check}')
+        finally:
+            remove(directory)
+
+
+if __name__ == "__main__":
+    main()
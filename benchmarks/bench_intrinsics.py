@@ -0,0 +1,68 @@
+"""Cycles and ROM size of project11 programs + OS with and without intrinsics for the hot Math/Memory calls.
+
+Programs that halt are timed to Sys.halt. Square (moving right) and Pong never do, so they are timed until
+they have entered the function that draws one frame a fixed number of times. Average waits for typed input
+and is left out.
+
+Unreachable functions are left out of both builds, so that Pong + OS fits in ROM.
+
+Usage: python benchmarks/bench_intrinsics.py [program ...]
+"""
+import sys
+
+from programs import compile_program, remove, translate_program
+
+from Assembler import Assembler
+from CPUEmulator import CPUEmulator
+
+# program -> (function to stop at, number of times it is entered, key held down)
+stop_points = {
+    "Seven": ("Sys.halt", 1, 0),
+    "ConvertToBin": ("Sys.halt", 1, 0),
+    "ComplexArrays": ("Sys.halt", 1, 0),
+    "Square": ("SquareGame.moveSquare", 40, 132),
+    "Pong": ("PongGame.moveBall", 40, 0),
+}
+
+max_cycles = 500_000_000
+
+
+def run(program: str, directory, intrinsics: bool):
+    translator = translate_program(directory, shared_calls=True, compact_compare=True, intrinsics=intrinsics,
+                                   drop_unreachable=True)
+    assembler = Assembler(translator.instructions)
+    emulator = CPUEmulator(assembler.assemble(), assembler.symbols)
+
+    function, times, key = stop_points[program]
+    stop_at = assembler.symbols[function]
+    # ConvertToBin reads its input from RAM[8000]
+    emulator.ram[8000] = 12345
+    emulator.press(key)
+
+    for _ in range(times):
+        emulator.run(max_cycles - emulator.cycles, stop_at)
+        if emulator.pc != stop_at:
+            raise RuntimeError(f'{program} did not reach {function} within {max_cycles} cycles')
+        # step into the function so that the next run does not stop right away
+        emulator.run(1)
+
+    return translator.rom_words, emulator.cycles, sum(translator.intrinsic_calls.values())
+
+
+def main():
+    programs = sys.argv[1:] or list(stop_points)
+
+    print(f'{"program":14} {"ROM words":>19} {"cycles":>25} {"speedup":>8}  intrinsic call sites')
+    for program in programs:
+        directory = compile_program(program)
+        try:
+            words, cycles, _ = run(program, directory, False)
+            intrinsic_words, intrinsic_cycles, sites = run(program, directory, True)
+        finally:
+            remove(directory)
+
+        print(f'{program:14} {words:9} -> {intrinsic_words:6} {cycles:12} -> {intrinsic_cycles:9} {cycles / intrinsic_cycles:7.2f}x  {sites}')
+
+
+if __name__ == "__main__":
+    main()
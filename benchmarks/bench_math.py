@@ -0,0 +1,166 @@
+"""Hack cycles per Math.multiply, Math.divide and Math.pow call of the bundled Math class, across operand ranges.
+
+Once the OS is initialized, the operands of a range are written to the screen memory, which nothing draws on, as
+(x, y, result) triples after the operation and the number of triples. Main.main applies the operation to each
+triple and stores the result, which is checked. Cycles are counted with the profiler, for the Jack functions
+(without intrinsics) and for the translator's shared $$MULTIPLY and $$DIVIDE routines (with intrinsics).
+
+Usage: python benchmarks/bench_math.py [operands per range]
+"""
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+from programs import OS_CLASSES, ROOT, remove, translate_program
+
+from Assembler import Assembler
+from CPUEmulator import CPUEmulator
+from JackCompiler import compile_file
+from Profiler import Profiler
+
+apply_operation = """class Main {
+    function void main() {
+        var int operation, count, i, address, x, y;
+        let operation = Memory.peek(16384);
+        let count = Memory.peek(16385);
+        let address = 16386;
+
+        while (i < count) {
+            let x = Memory.peek(address);
+            let y = Memory.peek(address + 1);
+            if (operation = 0) {
+                do Memory.poke(address + 2, x * y);
+            }
+            if (operation = 1) {
+                do Memory.poke(address + 2, x / y);
+            }
+            if (operation = 2) {
+                do Memory.poke(address + 2, Math.pow(x, y));
+            }
+
+            let address = address + 3;
+            let i = i + 1;
+        }
+
+        return;
+    }
+}
+"""
+
+
+def to_word(value: int) -> int:
+    return (value + 0x8000) % 0x10000 - 0x8000
+
+
+def divide(x: int, y: int) -> int:
+    quotient = abs(x) // abs(y)
+    return quotient if (x < 0) == (y < 0) else -quotient
+
+
+def word(low: int, high: int):
+    return lambda: random.randint(low, high)
+
+
+def power_of_two(low: int, high: int):
+    return lambda: 1 << random.randint(low, high)
+
+
+def one_of(*values: int):
+    return lambda: random.choice(values)
+
+
+# operands at the ends of the word range, where negating or doubling overflows
+edges = (-32768, -32767, -16384, -2, -1, 1, 2, 3, 16384, 32767)
+
+
+# operation -> (its code in Main.main, the function or routine timed with and without intrinsics, its result,
+# and its ranges: name -> (x, y))
+operations = {
+    "multiply": (0, "Math.multiply", "$$MULTIPLY", lambda x, y: to_word(x * y), {
+        "4-bit * 4-bit": (word(0, 15), word(0, 15)),
+        "8-bit * 8-bit": (word(0, 255), word(0, 255)),
+        "15-bit * 4-bit": (word(0, 32767), word(0, 15)),
+        "4-bit * 15-bit": (word(0, 15), word(0, 32767)),
+        "15-bit * 15-bit": (word(0, 32767), word(0, 32767)),
+        "signed * signed": (word(-32768, 32767), word(-32768, 32767)),
+    }),
+    "divide": (1, "Math.divide", "$$DIVIDE", lambda x, y: to_word(divide(x, y)), {
+        "9-bit / 16": (word(0, 511), lambda: 16),
+        "15-bit / 2^k": (word(0, 32767), power_of_two(0, 14)),
+        "15-bit / 4-bit": (word(0, 32767), word(1, 15)),
+        "15-bit / 8-bit": (word(0, 32767), word(1, 255)),
+        "15-bit / 15-bit": (word(0, 32767), word(1, 32767)),
+        "signed / signed": (word(-32767, 32767), lambda: random.choice([-1, 1]) * random.randint(1, 32767)),
+        "edge / edge": (one_of(0, *edges), one_of(*edges)),
+    }),
+    "pow": (2, "Math.pow", "Math.pow", lambda x, y: to_word(x ** y), {
+        "2^n": (lambda: 2, word(0, 15)),
+        "3^n": (lambda: 3, word(0, 10)),
+    }),
+}
+
+max_cycles = 1_000_000_000
+
+
+def build(intrinsics: bool) -> Assembler:
+    directory = Path(tempfile.mkdtemp(prefix="math-"))
+    try:
+        (directory / "Main.jack").write_text(apply_operation)
+        for os_class in OS_CLASSES:
+            shutil.copy(ROOT / f'{os_class}.jack', directory)
+        for source in sorted(directory.glob("*.jack")):
+            compile_file(str(source))
+
+        translator = translate_program(directory, shared_calls=True, compact_compare=True, intrinsics=intrinsics)
+    finally:
+        remove(directory)
+
+    return Assembler(translator.instructions)
+
+
+def run(assembler: Assembler, rom, code: int, operands, timed: str) -> Tuple[float, List[int]]:
+    profiler = Profiler(rom, assembler.symbols)
+    profiler.run(max_cycles, assembler.symbols["Main.main"])
+
+    screen = CPUEmulator.screen
+    profiler.ram[screen] = code
+    profiler.ram[screen + 1] = len(operands)
+    for i, (x, y) in enumerate(operands):
+        profiler.ram[screen + 2 + 3 * i] = x & 0xFFFF
+        profiler.ram[screen + 3 + 3 * i] = y & 0xFFFF
+
+    profiler.run(max_cycles, assembler.symbols["Sys.halt"])
+    results = [to_word(profiler.ram[screen + 4 + 3 * i]) for i in range(len(operands))]
+    calls = profiler.calls[timed]
+    return profiler.inclusive_cycles()[timed] / max(calls, 1), results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    random.seed(0)
+
+    builds = []
+    for intrinsics in (False, True):
+        assembler = build(intrinsics)
+        builds.append((assembler, assembler.assemble()))
+
+    print(f'{"":10} {"operands":16} {"Jack function":>14} {"intrinsic":>10}  cycles per call')
+    for name, (code, function, routine, result, ranges) in operations.items():
+        for range_name, (x, y) in ranges.items():
+            operands = [(x(), y()) for _ in range(count)]
+            expected = [result(a, b) for a, b in operands]
+
+            cycles = []
+            for (assembler, rom), timed in zip(builds, (function, routine)):
+                per_call, results = run(assembler, rom, code, operands, timed)
+                wrong = sum(a != b for a, b in zip(results, expected))
+                cycles.append(f'{per_call:.0f}' + (f' ({wrong} WRONG)' if wrong else ""))
+
+            print(f'{name:10} {range_name:16} {cycles[0]:>14} {cycles[1]:>10}')
+
+
+if __name__ == "__main__":
+    main()
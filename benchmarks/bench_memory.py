@@ -0,0 +1,119 @@
+"""Cycles per Memory.alloc and Memory.deAlloc of the bundled Memory class under allocation churn, and the largest
+free block of the heap over time.
+
+Main.main keeps 64 slots of strings. Every round, 64 pseudo-random slots are picked: an empty slot gets a
+String.new of 0 to 31 characters, and a full one has its string disposed. At the start of each round Main.main
+calls Main.checkpoint, where the profiler stops to walk the heap through the size tags at both ends of each block.
+
+Usage: python benchmarks/bench_memory.py [rounds] [report every N rounds]
+"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from programs import OS_CLASSES, ROOT, remove, translate_program
+
+from Assembler import Assembler
+from JackCompiler import compile_file
+from Profiler import Profiler
+
+churn = """class Main {
+    function void main() {
+        var Array slots;
+        var String string;
+        var int round, i, seed, slot;
+        let slots = Array.new(64);
+        let seed = 1;
+
+        while (round < %d) {
+            do Main.checkpoint();
+            let i = 0;
+            while (i < 64) {
+                let seed = ((seed * 25173) + 13849) & 32767;
+                let slot = (seed / 128) & 63;
+                if (slots[slot] = 0) {
+                    let slots[slot] = String.new(seed / 1024);
+                } else {
+                    let string = slots[slot];
+                    do string.dispose();
+                    let slots[slot] = 0;
+                }
+
+                let i = i + 1;
+            }
+
+            let round = round + 1;
+        }
+
+        do Main.checkpoint();
+        return;
+    }
+
+    function void checkpoint() {
+        return;
+    }
+}
+"""
+
+# the blocks of the heap, after the free list heads, up to the tag that ends them
+heap_blocks, heap_end = 2058, 16383
+max_cycles = 1_000_000_000
+
+
+def free_blocks(ram):
+    """Sizes of the free blocks of the heap, walking it from tag to tag."""
+    block = heap_blocks
+    while block < heap_end:
+        tag = ram[block] & 0xFFFF
+        if tag < 0x8000:
+            yield tag
+        else:
+            tag = 0x10000 - tag
+        block += tag
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    every = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    directory = Path(tempfile.mkdtemp(prefix="memory-"))
+    try:
+        (directory / "Main.jack").write_text(churn % rounds)
+        for os_class in OS_CLASSES:
+            shutil.copy(ROOT / f'{os_class}.jack', directory)
+        for source in sorted(directory.glob("*.jack")):
+            compile_file(str(source))
+
+        translator = translate_program(directory, shared_calls=True, compact_compare=True, intrinsics=True)
+    finally:
+        remove(directory)
+
+    assembler = Assembler(translator.instructions)
+    profiler = Profiler(assembler.assemble(), assembler.symbols)
+    checkpoint, halt = assembler.symbols["Main.checkpoint"], assembler.symbols["Sys.halt"]
+
+    # the allocations of the OS classes' init functions are left out
+    profiler.run(max_cycles, checkpoint)
+    start_cycles, start_calls = profiler.inclusive_cycles(), profiler.calls.copy()
+
+    print(f'{"round":>6} {"allocs":>8} {"cycles/alloc":>13} {"frees":>8} {"cycles/free":>12} {"largest free":>13} {"free words":>11}')
+    for round in range(rounds + 1):
+        if round > 0:
+            profiler.run(1)
+            profiler.run(max_cycles, checkpoint)
+        if profiler.pc != checkpoint:
+            where = "in Sys.halt (heap overflow?)" if profiler.pc == halt else f'at ROM address {profiler.pc}'
+            print(f'stopped {where} during round {round}')
+            break
+
+        if round % every == 0 or round == rounds:
+            inclusive, calls = profiler.inclusive_cycles() - start_cycles, profiler.calls - start_calls
+            allocs, frees = calls["Memory.alloc"], calls["Memory.deAlloc"]
+            sizes = list(free_blocks(profiler.ram))
+            print(f'{round:6} {allocs:8} {inclusive["Memory.alloc"] / max(allocs, 1):13.1f} {frees:8} '
+                  f'{inclusive["Memory.deAlloc"] / max(frees, 1):12.1f} {max(sizes, default=0):13} {sum(sizes):11}')
+
+
+if __name__ == "__main__":
+    main()
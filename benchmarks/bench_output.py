@@ -0,0 +1,93 @@
+"""Time and write system calls taken to write the VM and Hack code of the project11 corpus, scaled up.
+
+The code of every project11 program + OS is written `scale` times over, one file after another, in three ways:
+  print per line   print() per line, reopening the output in append mode per input file (Translate before Emitter)
+  write per line   file.write() per line into one open file
+  Emitter          the shared Emitter, which writes the joined text of each chunk of lines at once
+
+System calls are counted from /proc/self/io (Linux); elsewhere only times are shown.
+
+Usage: python benchmarks/bench_output.py [scale] [repeats]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from programs import compile_program, remove
+
+from Emitter import Emitter
+from VMTranslator import Translate
+
+PROGRAMS = ["Average", "ComplexArrays", "ConvertToBin", "Pong", "Seven", "Square"]
+
+
+def write_syscalls() -> int:
+    try:
+        with open("/proc/self/io") as file:
+            return next(int(line.split()[1]) for line in file if line.startswith("syscw"))
+    except OSError:
+        return -1
+
+
+def print_per_line(filename: str, files) -> None:
+    Path(filename).unlink(missing_ok=True)
+    for lines in files:
+        with open(filename, "a") as file:
+            for line in lines:
+                print(line, file=file)
+
+
+def write_per_line(filename: str, files) -> None:
+    with open(filename, "w") as file:
+        for lines in files:
+            for line in lines:
+                file.write(line + "\n")
+
+
+def emitter(filename: str, files) -> None:
+    output = Emitter(filename)
+    for lines in files:
+        output.extend(lines)
+    output.close()
+
+
+def measure(write, filename: str, files, repeats: int):
+    best_time, syscalls = float("inf"), 0
+    for _ in range(repeats):
+        before = write_syscalls()
+        start = time.perf_counter()
+        write(filename, files)
+        best_time = min(best_time, time.perf_counter() - start)
+        syscalls = write_syscalls() - before
+
+    return best_time, syscalls if before >= 0 else None
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    vm_files, asm_files = [], []
+    for program in PROGRAMS:
+        directory = compile_program(program)
+        try:
+            for vm_file in sorted(directory.glob("*.vm")):
+                vm_files.append(vm_file.read_text().splitlines())
+                asm_files.append(Translate().translate_fragment(str(vm_file)).code)
+        finally:
+            remove(directory)
+
+    output = Path(tempfile.mkdtemp(prefix="output-"))
+    try:
+        for kind, files in (("VM", vm_files * scale), ("Hack", asm_files * scale)):
+            print(f'{kind} code: {len(files)} files, {sum(map(len, files))} lines')
+            for name, write in (("print per line", print_per_line), ("write per line", write_per_line), ("Emitter", emitter)):
+                elapsed, syscalls = measure(write, str(output / "out"), files, repeats)
+                print(f'  {name:15} {elapsed * 1000:9.1f} ms  {syscalls if syscalls is not None else "n/a":>7} write calls')
+    finally:
+        remove(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Translation time of a large synthetic program, one file after another and with --jobs worker processes.
+
+Every class has the same mix of arithmetic, comparisons, branches, calls and array accesses. The output of each
+parallel run is checked to be identical to the serial one.
+
+Usage: python benchmarks/bench_parallel_translate.py [classes] [functions per class] [jobs ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from programs import remove
+
+from JackCompiler import compile_file
+from VMTranslator import Translate
+
+
+def generate_class(index: int, classes: int, functions: int) -> str:
+    body = []
+    for f in range(functions):
+        callee = f'Class{(index + 1) % classes}.f{(f + 1) % functions}'
+        body.append(f"""
+    function int f{f}(int n, Array a) {{
+        var int i, sum;
+        let i = 0;
+        while (i < n) {{
+            if ((a[i] > sum) & ~(i = {f})) {{
+                let sum = sum + (a[i] * 3) - (i / 2);
+            }} else {{
+                let sum = Math.max(sum, {callee}(i, a));
+            }}
+            let i = i + 1;
+        }}
+        return sum;
+    }}""")
+
+    return f'class Class{index} {{{"".join(body)}\n}}\n'
+
+
+def translate(input_files, jobs) -> Translate:
+    translator = Translate("", True, shared_calls=True, compact_compare=True)
+    translator.translate_files(input_files, jobs)
+    translator.finish()
+    return translator
+
+
+def main():
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    functions = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    job_counts = [int(arg) for arg in sys.argv[3:]] or sorted({1, 2, 4, os.cpu_count()})
+
+    directory = Path(tempfile.mkdtemp(prefix="parallel-"))
+    try:
+        for index in range(classes):
+            source = directory / f'Class{index}.jack'
+            source.write_text(generate_class(index, classes, functions))
+            compile_file(str(source))
+
+        input_files = sorted(str(file) for file in directory.glob("*.vm"))
+
+        start = time.perf_counter()
+        serial = translate(input_files, None)
+        serial_time = time.perf_counter() - start
+        print(f'{classes} classes, {classes * functions} functions, {serial.rom_words} ROM words, {os.cpu_count()} CPUs')
+        print(f'{"serial":>8} {serial_time * 1000:9.1f} ms')
+
+        for jobs in job_counts:
+            start = time.perf_counter()
+            parallel = translate(input_files, jobs)
+            elapsed = time.perf_counter() - start
+
+            status = "same output" if parallel.instructions == serial.instructions else "DIFFERENT OUTPUT"
+            print(f'{jobs:>3} jobs {elapsed * 1000:9.1f} ms {serial_time / elapsed:6.2f}x  {status}')
+    finally:
+        remove(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Cycles taken by the bundled Screen class to fill the whole screen, and to draw lines and a circle.
+
+Each case is a Main.main compiled with the OS, drawing in black; it is timed from the call of Main.main to
+Sys.halt and the screen is then checked for the number of pixels the case should have set.
+
+Usage: python benchmarks/bench_screen.py [case ...]
+"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from programs import OS_CLASSES, ROOT, remove, translate_program
+
+from Assembler import Assembler
+from CPUEmulator import CPUEmulator
+from JackCompiler import compile_file
+
+# case -> (local variables of Main.main, its statements, number of black pixels they leave)
+cases = {
+    "drawPixel over the screen": ("x, y", """
+        while (y < 256) {
+            let x = 0;
+            while (x < 512) {
+                do Screen.drawPixel(x, y);
+                let x = x + 1;
+            }
+            let y = y + 1;
+        }""", 512 * 256),
+    "drawHorizontalLine per row": ("y", """
+        while (y < 256) {
+            do Screen.drawHorizontalLine(y, 0, 511);
+            let y = y + 1;
+        }""", 512 * 256),
+    "drawVerticalLine per column": ("x", """
+        while (x < 512) {
+            do Screen.drawVerticalLine(x, 0, 255);
+            let x = x + 1;
+        }""", 512 * 256),
+    "drawRectangle(0, 0, 511, 255)": ("x", """
+        do Screen.drawRectangle(0, 0, 511, 255);""", 512 * 256),
+    "drawRectangle(3, 5, 300, 200)": ("x", """
+        do Screen.drawRectangle(3, 5, 300, 200);""", 298 * 196),
+    "drawCircle(256, 128, 100)": ("x", """
+        do Screen.drawCircle(256, 128, 100);""", None),
+    "clearScreen": ("x", """
+        do Screen.drawRectangle(0, 0, 511, 255);
+        do Screen.clearScreen();""", 0),
+}
+
+max_cycles = 1_000_000_000
+
+
+def run(name: str) -> None:
+    local_vars, statements, expected_pixels = cases[name]
+
+    directory = Path(tempfile.mkdtemp(prefix="screen-"))
+    try:
+        (directory / "Main.jack").write_text(f"""class Main {{
+    function void main() {{
+        var int {local_vars};
+        do Screen.setColor(true);{statements}
+        return;
+    }}
+}}
+""")
+        for os_class in OS_CLASSES:
+            shutil.copy(ROOT / f'{os_class}.jack', directory)
+        for source in sorted(directory.glob("*.jack")):
+            compile_file(str(source))
+
+        translator = translate_program(directory, shared_calls=True, compact_compare=True, intrinsics=True)
+    finally:
+        remove(directory)
+
+    assembler = Assembler(translator.instructions)
+    emulator = CPUEmulator(assembler.assemble(), assembler.symbols)
+
+    emulator.run(max_cycles, assembler.symbols["Main.main"])
+    start = emulator.cycles
+    emulator.run(max_cycles, assembler.symbols["Sys.halt"])
+    if emulator.pc != assembler.symbols["Sys.halt"]:
+        raise RuntimeError(f'{name} did not finish within {max_cycles} cycles')
+
+    screen = emulator.ram[CPUEmulator.screen:CPUEmulator.keyboard]
+    pixels = sum(bin(word & 0xFFFF).count("1") for word in screen)
+    check = "" if expected_pixels is None or pixels == expected_pixels else f'  WRONG: {pixels} pixels instead of {expected_pixels}'
+
+    print(f'{name:30} {emulator.cycles - start:12} cycles {pixels:8} pixels{check}')
+
+
+def main():
+    for name in sys.argv[1:] or cases:
+        run(name)
+
+
+if __name__ == "__main__":
+    main()
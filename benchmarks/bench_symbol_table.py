@@ -0,0 +1,48 @@
+"""Compile time of synthetic classes with thousands of fields, locals and references to them.
+
+Usage: python benchmarks/bench_symbol_table.py [symbols ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from JackCompiler import compile_source
+
+
+def generate_class(symbols: int) -> str:
+    fields = ", ".join(f"f{i}" for i in range(symbols))
+    local_vars = ", ".join(f"v{i}" for i in range(symbols))
+    # every statement references a field, a local and an argument, spread over the whole table
+    statements = "\n".join(f"        let v{i} = f{(i * 7) % symbols} + v{(i * 13) % symbols};" for i in range(symbols))
+
+    return f"""class Big {{
+    field int {fields};
+
+    method int run(int a, int b) {{
+        var int {local_vars};
+{statements}
+        let f0 = a + b;
+        return v0;
+    }}
+}}
+"""
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 1000, 2000, 4000]
+
+    for symbols in sizes:
+        source = generate_class(symbols)
+
+        start = time.perf_counter()
+        compile_source(source)
+        elapsed = time.perf_counter() - start
+
+        print(f"{symbols:>6} fields + {symbols} locals  {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Tokenizer throughput on multi-megabyte generated .jack sources.
+
+Usage: python benchmarks/bench_tokenizer.py [megabytes ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from JackTokenizer import scan
+
+
+def generate_source(megabytes: float) -> str:
+    # every .jack file in the repo (OS + project11), with extra comment styles and "//" inside strings
+    corpus = "".join(path.read_text() for path in sorted(ROOT.glob("**/*.jack")))
+    corpus += '/* block\n comment */ do Output.printString("http://nand2tetris.org"); // trailing\n'
+
+    target = int(megabytes * 1024 * 1024)
+    return corpus * (target // len(corpus) + 1)
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+
+    for megabytes in sizes:
+        source = generate_source(megabytes)
+        size = len(source) / (1024 * 1024)
+
+        start = time.perf_counter()
+        tokens = scan(source)
+        elapsed = time.perf_counter() - start
+
+        print(f"{size:7.2f} MB  {len(tokens):>10} tokens  {elapsed:7.3f} s  {size / elapsed:7.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""VM emulator speed on project11 programs, with the bundled .jack OS and with the native one.
+
+Usage: python benchmarks/bench_vm_emulator.py [max VM instructions] [program ...]
+"""
+import io
+import sys
+import time
+
+from programs import compile_program, remove
+
+from VMEmulator import VMEmulator
+
+
+def run(program: str, with_os: bool, max_steps: int) -> None:
+    directory = compile_program(program, with_os)
+    try:
+        # Average reads its numbers from the keyboard
+        emulator = VMEmulator(io.StringIO(), io.StringIO("3\n10\n20\n30\n"))
+        for vm_file in sorted(directory.glob("*.vm")):
+            emulator.load(str(vm_file))
+    finally:
+        remove(directory)
+
+    # ConvertToBin reads its input from RAM[8000]
+    emulator.ram[8000] = 12345
+
+    start = time.perf_counter()
+    try:
+        status = "halted" if emulator.run(max_steps) else "running"
+    except RuntimeError as error:
+        status = f'failed: {error}'
+    elapsed = time.perf_counter() - start
+
+    os_name = "bundled OS" if with_os else "native OS"
+    print(f'{program:14} {os_name:11} {emulator.executed:10} VM instructions {elapsed:7.2f} s '
+          f'{emulator.executed / elapsed / 1e6:6.2f} M instructions/s  {status}')
+
+
+def main():
+    max_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    programs = sys.argv[2:] or ["Seven", "ConvertToBin", "ComplexArrays", "Average", "Square", "Pong"]
+
+    for program in programs:
+        for with_os in (True, False):
+            run(program, with_os, max_steps)
+
+
+if __name__ == "__main__":
+    main()
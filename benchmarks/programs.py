@@ -0,0 +1,42 @@
+"""Builds project11 programs together with the bundled OS, for the benchmarks in this directory."""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from JackCompiler import compile_file
+from VMTranslator import Translate
+
+OS_CLASSES = ["Array", "Keyboard", "Math", "Memory", "Output", "Screen", "String", "Sys"]
+
+
+def compile_program(program: str, with_os: bool = True, **compile_options) -> Path:
+    """Compiles project11/<program> (plus the OS) into a fresh temporary directory and returns it."""
+    directory = Path(tempfile.mkdtemp(prefix=f'{program}-'))
+
+    sources = list((ROOT / "project11" / program).glob("*.jack"))
+    if with_os:
+        sources += [ROOT / f'{name}.jack' for name in OS_CLASSES]
+
+    for source in sources:
+        shutil.copy(source, directory)
+    for source in sorted(directory.glob("*.jack")):
+        compile_file(str(source), **compile_options)
+
+    return directory
+
+
+def translate_program(directory: Path, **translate_options) -> Translate:
+    """Translates every .vm file of a directory in memory, with the bootstrap, in a stable order."""
+    translator = Translate("", True, **translate_options)
+    translator.translate_files([str(vm_file) for vm_file in sorted(directory.glob("*.vm"))])
+    translator.finish()
+
+    return translator
+
+
+def remove(directory: Path) -> None:
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,41 @@
+"""Concurrency stress check for JackCompiler.compile_source().
+
+Compiles every project11 class from many threads at once, in random order, and checks that each result
+is byte-identical to compiling the same class alone.
+
+Usage: python benchmarks/stress_compile_source.py [threads] [rounds]
+"""
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from JackCompiler import compile_source
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    sources = [path.read_text() for path in sorted(ROOT.glob("project11/*/*.jack"))]
+    expected = [compile_source(source) for source in sources]
+
+    jobs = [i for i in range(len(sources)) for _ in range(rounds)]
+    random.shuffle(jobs)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda i: compile_source(sources[i]), jobs))
+    elapsed = time.perf_counter() - start
+
+    mismatches = sum(result != expected[i] for i, result in zip(jobs, results))
+    print(f"{len(jobs)} compilations on {threads} threads in {elapsed:.2f} s, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()